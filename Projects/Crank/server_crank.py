@@ -3,7 +3,6 @@ import os
 import subprocess
 import platform
 import shutil
-import time
 import uuid
 
 app = Flask(__name__)
@@ -14,7 +13,6 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 RACHET_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "rachet", "rachet", "rachet"))
 COMPILER_FILE = os.path.join(RACHET_DIR, "compiler.py")
-RESET_FILE = os.path.join(RACHET_DIR, "reset.py")
 ISO_NAME = "main.iso"
 
 # Store compilation jobs in memory
@@ -29,25 +27,18 @@ def windows_to_wsl_path(win_path):
     path_rest = path_rest.replace("\\", "/")
     return f"/mnt/{drive}{path_rest}"
 
-def compile_in_wsl(rx_path):
+def compile_in_wsl(rx_path, job_dir):
     """Compile .rx file silently in WSL."""
     rx_wsl = windows_to_wsl_path(rx_path)
     compiler_wsl = windows_to_wsl_path(COMPILER_FILE)
-    rx_dir_wsl = os.path.dirname(rx_wsl)
-    cmd = f"cd {rx_dir_wsl} && python3 {compiler_wsl} {rx_wsl}"
+    job_dir_wsl = windows_to_wsl_path(job_dir)
+    cmd = (f"cd '{job_dir_wsl}' && python3 '{compiler_wsl}' '{rx_wsl}'"
+           f" '--build-dir={job_dir_wsl}/build' '--output={job_dir_wsl}'")
     result = subprocess.run(["wsl", "bash", "-c", cmd], capture_output=True, text=True)
     return result
 
-def run_reset():
-    """Run reset.py silently after sending ISO."""
-    if platform.system() == "Windows":
-        reset_wsl = windows_to_wsl_path(RESET_FILE)
-        reset_dir_wsl = windows_to_wsl_path(RACHET_DIR)
-        cmd_str = f"cd {reset_dir_wsl} && python3 {reset_wsl}"
-        subprocess.run(["wsl", "bash", "-c", cmd_str], capture_output=True, text=True)
-    else:
-        subprocess.run([python_command(), RESET_FILE],
-                       cwd=RACHET_DIR, capture_output=True, text=True)
+def remove_job_dir(job_dir):
+    shutil.rmtree(job_dir, ignore_errors=True)
 
 @app.route("/compile", methods=["POST"])
 def compile_file():
@@ -62,26 +53,26 @@ def compile_file():
     # Generate unique job ID
     job_id = str(uuid.uuid4())
     
-    # Save uploaded file
-    temp_path = os.path.join(UPLOAD_FOLDER, file.filename)
-    file.save(temp_path)
-    
-    # Copy to Rachet directory
-    dest_path = os.path.join(RACHET_DIR, file.filename)
-    shutil.copy2(temp_path, RACHET_DIR)
+    # Every job builds in its own directory, so jobs can run concurrently
+    job_dir = os.path.join(UPLOAD_FOLDER, job_id)
+    os.makedirs(job_dir)
+    dest_path = os.path.join(job_dir, os.path.basename(file.filename))
+    file.save(dest_path)
 
     print(f"[{job_id}] Received {file.filename}, starting compilation...")
 
     # Compile silently
     try:
         if platform.system() == "Windows":
-            result = compile_in_wsl(dest_path)
+            result = compile_in_wsl(dest_path, job_dir)
         else:
-            result = subprocess.run([python_command(), COMPILER_FILE, dest_path],
-                           cwd=RACHET_DIR, capture_output=True, text=True)
+            result = subprocess.run([python_command(), COMPILER_FILE, dest_path,
+                                     f"--build-dir={os.path.join(job_dir, 'build')}", f"--output={job_dir}"],
+                           cwd=job_dir, capture_output=True, text=True)
         
         if result.returncode != 0:
             print(f"[{job_id}] Compilation FAILED")
+            remove_job_dir(job_dir)
             compilation_jobs[job_id] = {
                 "status": "failed",
                 "error": "Compilation failed",
@@ -98,29 +89,26 @@ def compile_file():
             
     except Exception as e:
         print(f"[{job_id}] Compilation ERROR: {e}")
+        remove_job_dir(job_dir)
         compilation_jobs[job_id] = {
             "status": "failed",
             "error": str(e)
         }
         return jsonify({"job_id": job_id, "status": "failed", "error": str(e)}), 500
 
-    # Wait for ISO to be created
-    iso_path = os.path.join(RACHET_DIR, ISO_NAME)
-    for _ in range(20):
-        if os.path.exists(iso_path):
-            break
-        time.sleep(0.5)
-    else:
+    # The compiler has exited, so the ISO is either complete or missing
+    iso_path = os.path.join(job_dir, ISO_NAME)
+    if not os.path.exists(iso_path):
         print(f"[{job_id}] ISO not generated")
+        remove_job_dir(job_dir)
         compilation_jobs[job_id] = {
             "status": "failed",
-            "error": "ISO not generated in time"
+            "error": "ISO not generated"
         }
         return jsonify({"job_id": job_id, "status": "failed", "error": "ISO not generated"}), 500
 
-    # Clean up .rx files
+    # Clean up the .rx file
     try:
-        os.remove(temp_path)
         os.remove(dest_path)
     except Exception:
         pass
@@ -129,6 +117,7 @@ def compile_file():
     compilation_jobs[job_id] = {
         "status": "ready",
         "iso_path": iso_path,
+        "job_dir": job_dir,
         "iso_size": os.path.getsize(iso_path)
     }
 
@@ -164,8 +153,7 @@ def download_iso(job_id):
 
     # Clean up
     try:
-        run_reset()
-        os.remove(iso_path)
+        remove_job_dir(job["job_dir"])
         del compilation_jobs[job_id]
         print(f"[{job_id}] Cleanup complete")
     except Exception as e:
@@ -178,4 +166,5 @@ def download_iso(job_id):
     return response
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5050)
\ No newline at end of file
+    # Jobs build in separate directories, so requests may be served in parallel
+    app.run(host="0.0.0.0", port=5050, threaded=True)
\ No newline at end of file
@@ -2,6 +2,9 @@
 import sys
 import os
 import subprocess
+import importlib.util
+
+IS_LINUX = sys.platform.startswith("linux")
 
 # -----------------------------
 # Helper to run gears.py commands
@@ -11,6 +14,15 @@ def gearsCmds(current_dir, cmd, args_full):
     if not os.path.exists(target_script):
         print(f"[!] gears.py not found at {target_script}")
         sys.exit(1)
+    if IS_LINUX:
+        # Run gears in this interpreter; it builds in-process too, so a
+        # compile costs no extra Python startups
+        spec = importlib.util.spec_from_file_location("gears", target_script)
+        gears = importlib.util.module_from_spec(spec)
+        sys.modules["gears"] = gears  # Lets compile's process pool find its worker
+        spec.loader.exec_module(gears)
+        sys.argv = [target_script, cmd, *args_full]
+        return gears.main()
     # Prepend the command itself so gears.py sees it
     subprocess.run([sys.executable, "-u", target_script, cmd, *args_full])
 
@@ -47,6 +59,7 @@ Flywheel commands:
     compress
     uncompress
     transform
+    bytecode
     fetch
     run
     edit
@@ -81,10 +94,10 @@ Flywheel commands:
     # ----------------------------------------
     # Rachet commands
     # ----------------------------------------
-    if cmd in ("compile", "compress", "uncompress", "transform", "fetch"):
+    if cmd in ("compile", "compress", "uncompress", "transform", "bytecode", "fetch"):
         gearsCmds(current_dir, cmd, args_full)
 
-    if cmd == "interpret":
+    elif cmd == "interpret":
         runPythonScript(os.path.join(current_dir, "rachet", "rachet", "rachet", "interpreter.py"), args_full)
     
     # ----------------------------------------
@@ -2,12 +2,23 @@ import os
 import sys
 import subprocess
 import shutil
-import zlib
 import glob
+import importlib
+import time
+import tempfile
+import contextlib
+import io
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 IS_WINDOWS = sys.platform == "win32"
 IS_LINUX = sys.platform.startswith("linux")
 
+RACHET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rachet")
+
+# Compiler settings of every gears build, part of its cache key. An
+# output_type of None keeps the program's own use statement
+BUILD_OPTIONS = {"optimize": True, "inline": True, "peephole": True, "registers": True, "separate": True, "output_type": None}
+
 def to_wsl_path(win_path: str) -> str:
     """Convert a Windows path to WSL path."""
     drive, path = os.path.splitdrive(win_path)
@@ -17,8 +28,15 @@ def to_linux_path(path: str) -> str:
     """Normalize path for Linux."""
     return os.path.abspath(path)
 
-def compress_file(input_file, noreplace):
-    """Compress a .rx or .txt file to .rxc format using zlib."""
+def remove_partial_output(output_file):
+    """Delete what a failed (de)compression wrote; output_file itself is untouched."""
+    try:
+        os.remove(output_file + ".part")
+    except OSError:
+        pass
+
+def compress_file(input_file, noreplace, algorithm="zlib", level=None):
+    """Compress a .rx or .txt file to .rxc format, streaming it in chunks."""
     if not os.path.isfile(input_file):
         print(f"[!] File {input_file} not found.")
         return False
@@ -30,15 +48,13 @@ def compress_file(input_file, noreplace):
         return False
 
     try:
-        with open(input_file, "rb") as f:
-            data = f.read()
-
-        compressed = zlib.compress(data, level=9)
-
-        with open(output_file, "wb") as f:
-            f.write(compressed)
+        archive = load_toolchain_module("archive")
+        # Written beside the output first, so a failure never leaves half a file
+        with open(input_file, "rb") as source, open(output_file + ".part", "wb") as target:
+            level = archive.compress_stream(source, target, algorithm, level)
+        os.replace(output_file + ".part", output_file)
 
-        print(f"[+] Compressed {input_file} -> {output_file}")
+        print(f"[+] Compressed {input_file} -> {output_file} ({algorithm} level {level})")
 
         if not noreplace:
             os.remove(input_file)
@@ -47,6 +63,7 @@ def compress_file(input_file, noreplace):
         return True
     except Exception as e:
         print(f"[!] Error compressing {input_file}: {e}")
+        remove_partial_output(output_file)
         return False
 
 def uncompress_file(input_file, noreplace, to_txt=False):
@@ -67,13 +84,10 @@ def uncompress_file(input_file, noreplace, to_txt=False):
         return False
 
     try:
-        with open(input_file, "rb") as f:
-            compressed = f.read()
-
-        data = zlib.decompress(compressed)
-
-        with open(output_file, "wb") as f:
-            f.write(data)
+        archive = load_toolchain_module("archive")
+        with open(input_file, "rb") as source, open(output_file + ".part", "wb") as target:
+            archive.decompress_stream(source, target)
+        os.replace(output_file + ".part", output_file)
 
         print(f"[+] Uncompressed {input_file} -> {output_file}")
 
@@ -84,6 +98,48 @@ def uncompress_file(input_file, noreplace, to_txt=False):
         return True
     except Exception as e:
         print(f"[!] Error uncompressing {input_file}: {e}")
+        remove_partial_output(output_file)
+        return False
+
+def bytecode_file(input_file, noreplace):
+    """Precompile a .rx or .rxc file to .rxb bytecode for the interpreter's vm engine."""
+    if not os.path.isfile(input_file):
+        print(f"[!] File {input_file} not found.")
+        return False
+
+    if not input_file.endswith((".rx", ".rxc")):
+        print(f"[!] File {input_file} is not a .rx or .rxc file")
+        return False
+
+    output_file = os.path.splitext(input_file)[0] + ".rxb"
+
+    if noreplace and os.path.exists(output_file):
+        print(f"[*] {output_file} exists (use without --noreplace to overwrite)")
+        return False
+
+    if RACHET_DIR not in sys.path:
+        sys.path.insert(0, RACHET_DIR)
+    from lexer import Lexer
+    from parser import Parser
+    from optimizer import Optimizer
+    from inliner import Inliner
+    from bytecode import BytecodeCompiler, save_bytecode, source_digest
+    from archive import open_source
+
+    try:
+        with open_source(input_file) as f:
+            source = f.read()
+
+        # Same passes as the interpreter runs by default
+        ast = Inliner().inline(Parser(Lexer(source).iter_tokens()).parse())
+        ast = Optimizer().optimize(ast)
+        program = BytecodeCompiler().compile_program(ast)
+        save_bytecode(program, output_file, source_digest(source, optimize=True, inline=True))
+
+        print(f"[+] Compiled {input_file} -> {output_file}")
+        return True
+    except Exception as e:
+        print(f"[!] Error compiling {input_file} to bytecode: {e}")
         return False
 
 def transform_file(input_file, noreplace):
@@ -116,22 +172,35 @@ def transform_file(input_file, noreplace):
         print(f"[!] Error transforming {input_file}: {e}")
         return False
 
-def process_files(patterns, action, noreplace=False, to_txt=False):
+def process_files(patterns, action, noreplace=False, to_txt=False, algorithm="zlib", level=None, jobs=None):
     """Process multiple files matching the given patterns."""
-    matched = 0
+    files = []
     for pattern in patterns:
         for file in glob.glob(pattern, recursive=True):
-            if os.path.isdir(file):
-                continue
-            if action == "compress":
-                if compress_file(file, noreplace):
-                    matched += 1
-            elif action == "uncompress":
-                if uncompress_file(file, noreplace, to_txt=to_txt):
-                    matched += 1
-            elif action == "transform":
-                if transform_file(file, noreplace):
-                    matched += 1
+            if not os.path.isdir(file) and file not in files:
+                files.append(file)
+
+    if action == "compress":
+        task = lambda file: compress_file(file, noreplace, algorithm, level)
+    elif action == "uncompress":
+        task = lambda file: uncompress_file(file, noreplace, to_txt=to_txt)
+    elif action == "transform":
+        task = lambda file: transform_file(file, noreplace)
+    elif action == "bytecode":
+        task = lambda file: bytecode_file(file, noreplace)
+
+    if action in ("compress", "uncompress"):
+        # Outputs are named after the input without its extension, so files
+        # that share it (a.rx and a.txt both give a.rxc) run in order in one
+        # task and no two threads ever write the same output
+        groups = {}
+        for file in files:
+            groups.setdefault(os.path.normcase(os.path.abspath(os.path.splitext(file)[0])), []).append(file)
+        # zlib, lzma and bz2 release the GIL, so threads overlap the work
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            matched = sum(pool.map(lambda group: sum(1 for file in group if task(file)), groups.values()))
+    else:
+        matched = sum(1 for file in files if task(file))
     print(f"[+] Processed {matched} file(s).")
     return matched > 0
 
@@ -156,12 +225,12 @@ def cleanup_compiler_directory(compiler_dir):
         except (FileNotFoundError, OSError):
             pass
 
-    iso_path = os.path.join(compiler_dir, "iso")
-    try:
-        shutil.rmtree(iso_path)
-        print("[+] Removed iso directory")
-    except (FileNotFoundError, OSError):
-        pass
+    for name in ("iso", "objects"):
+        try:
+            shutil.rmtree(os.path.join(compiler_dir, name))
+            print(f"[+] Removed {name} directory")
+        except (FileNotFoundError, OSError):
+            pass
 
 def move_iso_file(compiler_dir, target_dir, source_filename):
     """Move main.iso from compiler directory to target directory."""
@@ -188,7 +257,41 @@ def move_iso_file(compiler_dir, target_dir, source_filename):
         print(f"[!] Generated ISO file main.iso not found in compiler directory")
         return False
 
-def compile_rachet_file(file_path):
+def load_toolchain_module(name):
+    """Import a module from rachet/ the same way bytecode_file imports the toolchain."""
+    if RACHET_DIR not in sys.path:
+        sys.path.insert(0, RACHET_DIR)
+    return importlib.import_module(name)
+
+def compiler_flags():
+    """BUILD_OPTIONS as compiler.py arguments, for the builds run under WSL."""
+    names = {"optimize": "--no-optimize", "inline": "--no-inline", "peephole": "--no-peephole",
+             "registers": "--no-registers", "separate": "--single-object"}
+    return [flag for option, flag in names.items() if not BUILD_OPTIONS[option]]
+
+def restore_cached_build(cache_key, compiler_dir):
+    """Put a cached image where a fresh build would leave it. Returns True on a hit."""
+    buildcache = load_toolchain_module("buildcache")
+    for name in buildcache.OUTPUT_NAMES:
+        cached = buildcache.lookup("source", cache_key, name)
+        if cached is None:
+            continue
+        target_dir = os.getcwd() if name == "main.iso" else compiler_dir
+        shutil.copyfile(cached, os.path.join(target_dir, name))
+        print(f"[+] {name} is up to date (source, settings and compiler unchanged), reused cached build")
+        return True
+    return False
+
+def store_build(cache_key, compiler_dir, started):
+    """Cache the image the compiler just produced, before it is moved."""
+    buildcache = load_toolchain_module("buildcache")
+    for name in buildcache.OUTPUT_NAMES:
+        output = os.path.join(compiler_dir, name)
+        # A failed link leaves the previous build's image behind
+        if os.path.exists(output) and os.path.getmtime(output) >= started:
+            buildcache.store("source", cache_key, output)
+
+def compile_rachet_file(file_path, use_cache=True):
     """Compile a .rx file."""
     program_path = os.path.abspath(file_path)
     
@@ -196,8 +299,9 @@ def compile_rachet_file(file_path):
         print(f"Error: File '{file_path}' not found.")
         return 1
     
-    if not program_path.endswith('.rx'):
-        print(f"Error: File '{file_path}' is not a .rx file.")
+    # Compressed sources are decompressed in memory by the compiler
+    if not program_path.endswith(('.rx', '.rxc')):
+        print(f"Error: File '{file_path}' is not a .rx or .rxc file.")
         return 1
     
     program_name = os.path.basename(program_path)
@@ -212,7 +316,16 @@ def compile_rachet_file(file_path):
         print("Make sure the rachet/compiler.py file exists in the gears directory.")
         return 1
     
+    cache_key = None
+    if use_cache:
+        with open(program_path, "rb") as f:
+            cache_key = load_toolchain_module("buildcache").source_key(f.read(), **BUILD_OPTIONS)
+        if restore_cached_build(cache_key, compiler_dir):
+            return 0
+
     print(f"[*] Compiling {program_name}...")
+    compiler_args = compiler_flags() + ([] if use_cache else ["--no-cache"])
+    started = time.time()
     
     if IS_WINDOWS:
         # Use WSL on Windows
@@ -220,7 +333,7 @@ def compile_rachet_file(file_path):
         program_path_wsl = to_wsl_path(program_path)
         compiler_dir_wsl = to_wsl_path(compiler_dir)
         
-        cmd = f"cd '{compiler_dir_wsl}' && python3 '{compiler_path_wsl}' '{program_path_wsl}'"
+        cmd = f"cd '{compiler_dir_wsl}' && python3 '{compiler_path_wsl}' '{program_path_wsl}' {' '.join(compiler_args)}"
         
         try:
             result = subprocess.run(
@@ -230,6 +343,8 @@ def compile_rachet_file(file_path):
             
             if result.returncode == 0:
                 print("[+] Compilation successful!")
+                if cache_key:
+                    store_build(cache_key, compiler_dir, started)
                 current_dir = os.getcwd()
                 iso_moved = move_iso_file(compiler_dir, current_dir, program_name)
                 cleanup_compiler_directory(compiler_dir)
@@ -249,35 +364,124 @@ def compile_rachet_file(file_path):
             return 1
     
     elif IS_LINUX:
-        # Native compilation on Linux
+        # Native compilation on Linux, in this process rather than a new python3
         try:
-            result = subprocess.run(
-                ["python3", compiler_path, program_path],
-                cwd=compiler_dir,
-                text=True
-            )
-            
-            if result.returncode == 0:
-                print("[+] Compilation successful!")
-                current_dir = os.getcwd()
-                iso_moved = move_iso_file(compiler_dir, current_dir, program_name)
-                cleanup_compiler_directory(compiler_dir)
-                
-                if iso_moved:
-                    print(f"[+] Build complete! Your ISO is ready in the current directory.")
-                else:
-                    print("[!] Compilation completed but ISO file could not be moved.")
-            
-            return result.returncode
-            
+            output_path = load_toolchain_module("build").build(program_path, use_cache=use_cache, **BUILD_OPTIONS)
         except Exception as e:
-            print(f"Error running compiler: {e}")
+            print(f"Compilation error: {e}")
             return 1
+
+        print("[+] Compilation successful!")
+        if cache_key:
+            store_build(cache_key, compiler_dir, started)
+        if output_path.endswith(".iso"):
+            iso_moved = move_iso_file(compiler_dir, os.getcwd(), program_name)
+            cleanup_compiler_directory(compiler_dir)
+            
+            if iso_moved:
+                print(f"[+] Build complete! Your ISO is ready in the current directory.")
+            else:
+                print("[!] Compilation completed but ISO file could not be moved.")
+        else:
+            cleanup_compiler_directory(compiler_dir)
+            print(f"[+] Build complete! {output_path}")
+        
+        return 0
     
     else:
         print(f"Error: Unsupported platform '{sys.platform}'")
         return 1
 
+def build_batch_job(program_path, use_cache=True):
+    """Build one program of a batch in its own directory. Runs in a pool worker.
+
+    The image is written next to the source as <name>.iso or <name>.bin.
+    Returns (program_path, image path or None, seconds, status, error).
+    """
+    started = time.perf_counter()
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log), tempfile.TemporaryDirectory(prefix="rachet-job-") as job_dir:
+            buildcache = load_toolchain_module("buildcache")
+            cache_key = None
+            if use_cache:
+                with open(program_path, "rb") as f:
+                    cache_key = buildcache.source_key(f.read(), **BUILD_OPTIONS)
+                for name in buildcache.OUTPUT_NAMES:
+                    cached = buildcache.lookup("source", cache_key, name)
+                    if cached:
+                        image = os.path.splitext(program_path)[0] + os.path.splitext(name)[1]
+                        shutil.copyfile(cached, image)
+                        return program_path, image, time.perf_counter() - started, "cached", None
+
+            build_dir = os.path.join(job_dir, "build")
+            if IS_WINDOWS:
+                compiler_path = to_wsl_path(os.path.join(RACHET_DIR, "compiler.py"))
+                cmd = (f"python3 '{compiler_path}' '{to_wsl_path(program_path)}' '--build-dir={to_wsl_path(build_dir)}'"
+                       f" '--output={to_wsl_path(job_dir)}'" + "".join(f" {flag}" for flag in compiler_flags())
+                       + ("" if use_cache else " --no-cache"))
+                result = subprocess.run(["wsl", "bash", "-c", cmd], capture_output=True, text=True)
+                print(result.stdout)
+                built = [os.path.join(job_dir, name) for name in buildcache.OUTPUT_NAMES]
+                built = [path for path in built if os.path.exists(path)]
+                if result.returncode != 0 or not built:
+                    # compiler.py ends with the reason it failed
+                    output_lines = result.stdout.strip().splitlines()
+                    raise Exception(output_lines[-1] if output_lines else "Compilation failed")
+                built = built[0]
+            else:
+                built = load_toolchain_module("build").build(program_path, use_cache=use_cache, build_dir=build_dir,
+                                                             output_path=job_dir, **BUILD_OPTIONS)
+
+            if cache_key:
+                buildcache.store("source", cache_key, built)
+            image = os.path.splitext(program_path)[0] + os.path.splitext(built)[1]
+            shutil.move(built, image)
+            return program_path, image, time.perf_counter() - started, "built", None
+    except Exception as e:
+        # build() raises with the parse, codegen or linker error as the reason
+        return program_path, None, time.perf_counter() - started, "FAILED", str(e)
+
+def compile_rachet_files(patterns, use_cache=True, jobs=None):
+    """Compile every .rx file matching patterns across a pool of worker processes."""
+    programs = []
+    for pattern in patterns:
+        for file in sorted(glob.glob(pattern, recursive=True)):
+            path = os.path.abspath(file)
+            if path.endswith((".rx", ".rxc")) and os.path.isfile(path) and path not in programs:
+                programs.append(path)
+
+    if not programs:
+        print("Error: No .rx or .rxc files matched.")
+        return 1
+    if len(programs) == 1:
+        return compile_rachet_file(programs[0], use_cache=use_cache)
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(programs)))
+    print(f"[*] Compiling {len(programs)} programs with {jobs} worker(s)...")
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(build_batch_job, program, use_cache) for program in programs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"[{'+' if result[1] else '!'}] {os.path.relpath(result[0])}: {result[3]}")
+    elapsed = time.perf_counter() - started
+
+    results.sort(key=lambda result: programs.index(result[0]))
+    width = max(len("Program"), *(len(os.path.relpath(result[0])) for result in results))
+    print("")
+    print(f"{'Program':<{width}}  {'Status':<7} {'Time':>8}  Output")
+    for program, image, seconds, status, error in results:
+        detail = os.path.relpath(image) if image else error
+        print(f"{os.path.relpath(program):<{width}}  {status:<7} {seconds:>7.2f}s  {detail}")
+
+    failed = sum(1 for result in results if result[1] is None)
+    print("")
+    print(f"[{'!' if failed else '+'}] {len(results) - failed} succeeded, {failed} failed in {elapsed:.2f}s")
+    return 1 if failed else 0
+
 def show_rachet_info():
     """Display Rachet ASCII art and information."""
     print("""
@@ -313,41 +517,99 @@ def show_help():
     print("Gears - Rachet Language Toolchain")
     print("")
     print("Usage:")
-    print("  gears compile <file.rx>           Compile a Rachet source file")
+    print("  gears compile <files...>          Compile Rachet .rx/.rxc files (unchanged sources reuse the build cache)")
+    print("  gears cache clear                 Remove every cached build")
     print("  gears compress <files...>         Compress .rx or .txt files to .rxc")
     print("  gears uncompress <files...>       Uncompress .rxc files to .rx")
     print("  gears transform <files...>        Toggle between .txt and .rx extensions")
+    print("  gears bytecode <files...>         Precompile .rx/.rxc files to .rxb for 'interpret --engine vm'")
     print("  gears fetch                       Show Rachet information and ASCII art")
     print("  gears help                        Show this help message")
     print("")
     print("Compression Options:")
     print("  --noreplace                       Don't overwrite existing files or delete originals")
     print("  --txt                            (uncompress only) Output as .txt instead of .rx")
+    print("  --algorithm <zlib|lzma|bz2>       (compress only) Compression algorithm, recorded in the .rxc header (default: zlib)")
+    print("  --level <n>                       (compress only) Compression level, e.g. 1 for CI, 9 for archives")
+    print("  --jobs <n>                        Files (de)compressed at once (default: chosen by Python)")
+    print("")
+    print("Compile Options:")
+    print("  --no-cache                        Rebuild every stage without reading or writing the build cache")
+    print("  --jobs <n>                        Build at most n programs at once (default: one per CPU)")
+    print("                                    Several programs each get <name>.iso/.bin next to the source")
     print("")
     print("Examples:")
     print("  gears compile main.rx")
+    print("  gears compile main.rx --no-cache")
+    print("  gears compile \"examples/**/*.rx\" --jobs 4")
     print("  gears compress *.rx")
     print("  gears compress main.rx --noreplace")
+    print("  gears compress \"**/*.rx\" --algorithm lzma --level 9")
     print("  gears uncompress *.rxc")
     print("  gears uncompress main.rxc --txt")
     print("  gears transform main.txt")
+    print("  gears bytecode *.rx")
     print("  gears fetch")
 
+def parse_number(option, value, minimum=None):
+    """Return value as an int, or print a usage error and return None."""
+    try:
+        number = int(value)
+    except ValueError:
+        print(f"Error: {option} expects a whole number, got '{value}'.")
+        return None
+    if minimum is not None and number < minimum:
+        print(f"Error: {option} must be at least {minimum}, got {number}.")
+        return None
+    return number
+
 def parse_compression_args(args):
-    """Parse compression-related arguments."""
+    """Parse compression-related arguments into (files, noreplace, to_txt, options), or None on a bad value."""
     files = []
     noreplace = False
     to_txt = False
+    options = {"algorithm": "zlib", "level": None, "jobs": None}
     
-    for arg in args:
-        if arg == "--noreplace":
+    i = 0
+    while i < len(args):
+        if args[i] == "--noreplace":
             noreplace = True
-        elif arg == "--txt":
+        elif args[i] == "--txt":
             to_txt = True
+        elif args[i] in ("--algorithm", "--level", "--jobs") and i + 1 < len(args):
+            value = args[i + 1]
+            if args[i] != "--algorithm":
+                value = parse_number(args[i], value, 1 if args[i] == "--jobs" else None)
+                if value is None:
+                    return None
+            options[args[i][2:]] = value
+            i += 1
         else:
-            files.append(arg)
+            files.append(args[i])
+        i += 1
     
-    return files, noreplace, to_txt
+    return files, noreplace, to_txt, options
+
+def parse_compile_args(args):
+    """Parse compile arguments into (files, use_cache, jobs), or None on a bad value."""
+    files = []
+    use_cache = True
+    jobs = None
+    
+    i = 0
+    while i < len(args):
+        if args[i] == "--no-cache":
+            use_cache = False
+        elif args[i] == "--jobs" and i + 1 < len(args):
+            jobs = parse_number("--jobs", args[i + 1], 1)
+            if jobs is None:
+                return None
+            i += 1
+        else:
+            files.append(args[i])
+        i += 1
+    
+    return files, use_cache, jobs
 
 def main():
     if len(sys.argv) < 2:
@@ -359,38 +621,61 @@ def main():
     if command == "compile":
         if len(sys.argv) < 3:
             print("Error: No file specified for compilation.")
-            print("Usage: gears compile <file.rx>")
+            print("Usage: gears compile <files...> [--no-cache] [--jobs <n>]")
+            return 1
+        
+        parsed = parse_compile_args(sys.argv[2:])
+        if parsed is None:
+            return 1
+        files, use_cache, jobs = parsed
+        if not files:
+            print("Error: No file specified for compilation.")
+            return 1
+        if len(files) == 1 and not glob.has_magic(files[0]):
+            return compile_rachet_file(files[0], use_cache=use_cache)
+        return compile_rachet_files(files, use_cache=use_cache, jobs=jobs)
+    
+    elif command == "cache":
+        if len(sys.argv) < 3 or sys.argv[2].lower() != "clear":
+            print("Usage: gears cache clear")
             return 1
         
-        file_path = sys.argv[2]
-        return compile_rachet_file(file_path)
+        removed = load_toolchain_module("buildcache").clear()
+        print(f"[+] Removed {removed} cached build(s).")
+        return 0
     
     elif command == "compress":
         if len(sys.argv) < 3:
             print("Error: No files specified for compression.")
-            print("Usage: gears compress <files...> [--noreplace]")
+            print("Usage: gears compress <files...> [--noreplace] [--algorithm zlib|lzma|bz2] [--level <n>] [--jobs <n>]")
             return 1
         
-        files, noreplace, _ = parse_compression_args(sys.argv[2:])
+        parsed = parse_compression_args(sys.argv[2:])
+        if parsed is None:
+            return 1
+        files, noreplace, _, options = parsed
         if not files:
             print("Error: No files specified for compression.")
             return 1
         
-        success = process_files(files, "compress", noreplace=noreplace)
+        success = process_files(files, "compress", noreplace=noreplace, **options)
         return 0 if success else 1
     
     elif command == "uncompress":
         if len(sys.argv) < 3:
             print("Error: No files specified for uncompression.")
-            print("Usage: gears uncompress <files...> [--noreplace] [--txt]")
+            print("Usage: gears uncompress <files...> [--noreplace] [--txt] [--jobs <n>]")
             return 1
         
-        files, noreplace, to_txt = parse_compression_args(sys.argv[2:])
+        parsed = parse_compression_args(sys.argv[2:])
+        if parsed is None:
+            return 1
+        files, noreplace, to_txt, options = parsed
         if not files:
             print("Error: No files specified for uncompression.")
             return 1
         
-        success = process_files(files, "uncompress", noreplace=noreplace, to_txt=to_txt)
+        success = process_files(files, "uncompress", noreplace=noreplace, to_txt=to_txt, jobs=options["jobs"])
         return 0 if success else 1
     
     elif command == "transform":
@@ -399,7 +684,10 @@ def main():
             print("Usage: gears transform <files...> [--noreplace]")
             return 1
         
-        files, noreplace, _ = parse_compression_args(sys.argv[2:])
+        parsed = parse_compression_args(sys.argv[2:])
+        if parsed is None:
+            return 1
+        files, noreplace, _, _ = parsed
         if not files:
             print("Error: No files specified for transformation.")
             return 1
@@ -407,6 +695,23 @@ def main():
         success = process_files(files, "transform", noreplace=noreplace)
         return 0 if success else 1
     
+    elif command == "bytecode":
+        if len(sys.argv) < 3:
+            print("Error: No files specified for bytecode compilation.")
+            print("Usage: gears bytecode <files...> [--noreplace]")
+            return 1
+        
+        parsed = parse_compression_args(sys.argv[2:])
+        if parsed is None:
+            return 1
+        files, noreplace, _, _ = parsed
+        if not files:
+            print("Error: No files specified for bytecode compilation.")
+            return 1
+        
+        success = process_files(files, "bytecode", noreplace=noreplace)
+        return 0 if success else 1
+    
     elif command == "fetch":
         show_rachet_info()
         return 0
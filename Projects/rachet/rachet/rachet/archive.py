@@ -0,0 +1,116 @@
+import bz2
+import io
+import lzma
+import zlib
+
+# .rxc files start with MAGIC, a format version, the algorithm id and the
+# level it was compressed at. Files written before the header existed are a
+# bare zlib stream and are still read.
+MAGIC = b"RXC"
+VERSION = 1
+HEADER_SIZE = len(MAGIC) + 3
+
+# Extensions the interpreter and compiler accept as source files
+SOURCE_EXTENSIONS = ('.rx', '.rxc')
+
+# Sources are streamed through the (de)compressors in chunks of this size
+CHUNK_SIZE = 1 << 20
+
+# name -> (id, default level, valid levels, compressor, decompressor)
+ALGORITHMS = {
+    "zlib": (0, 9, range(0, 10), lambda level: zlib.compressobj(level), zlib.decompressobj),
+    "lzma": (1, 6, range(0, 10), lambda level: lzma.LZMACompressor(preset=level), lzma.LZMADecompressor),
+    "bz2": (2, 9, range(1, 10), lambda level: bz2.BZ2Compressor(level), bz2.BZ2Decompressor),
+}
+ALGORITHM_NAMES = {spec[0]: name for name, spec in ALGORITHMS.items()}
+
+def compress_stream(source, target, algorithm="zlib", level=None):
+    """Compress the binary file object source into target, header first.
+
+    Returns the level used. Higher levels trade speed for size: zlib 1 suits
+    CI, lzma 9 suits archives.
+    """
+    if algorithm not in ALGORITHMS:
+        raise Exception(f"Unknown compression algorithm '{algorithm}' (expected {', '.join(ALGORITHMS)})")
+    algorithm_id, default_level, levels, compressor, _ = ALGORITHMS[algorithm]
+    level = default_level if level is None else level
+    if level not in levels:
+        raise Exception(f"Level {level} is out of range for {algorithm} ({levels.start}-{levels.stop - 1})")
+
+    target.write(MAGIC + bytes([VERSION, algorithm_id, level]))
+    stream = compressor(level)
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        target.write(stream.compress(chunk))
+    target.write(stream.flush())
+    return level
+
+def read_header(source):
+    """Return (algorithm name, level, bytes read past a missing header)"""
+    header = source.read(HEADER_SIZE)
+    if header[:len(MAGIC)] != MAGIC:
+        return "zlib", None, header
+
+    version, algorithm_id, level = header[len(MAGIC):]
+    if version != VERSION:
+        raise Exception(f"Unsupported .rxc format version {version}")
+    if algorithm_id not in ALGORITHM_NAMES:
+        raise Exception(f"Unknown .rxc compression algorithm id {algorithm_id}")
+    return ALGORITHM_NAMES[algorithm_id], level, b""
+
+def iter_decompressed(source):
+    """Yield the decompressed contents of the binary file object source in chunks"""
+    algorithm, _, pending = read_header(source)
+    stream = ALGORITHMS[algorithm][4]()
+    while True:
+        chunk = pending or source.read(CHUNK_SIZE)
+        pending = b""
+        if not chunk:
+            break
+        data = stream.decompress(chunk)
+        if data:
+            yield data
+    if not stream.eof:
+        raise Exception("Compressed data is truncated")
+
+def decompress_stream(source, target):
+    for data in iter_decompressed(source):
+        target.write(data)
+
+class DecompressedReader(io.RawIOBase):
+    """Read-only raw stream over the decompressed contents of a .rxc file object"""
+
+    def __init__(self, source):
+        self.source = source
+        self.chunks = iter_decompressed(source)
+        self.pending = memoryview(b"")  # Unread tail of the current chunk
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.pending = memoryview(chunk)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self):
+        self.source.close()
+        super().close()
+
+def open_source(path):
+    """Open a .rx file, or a .rxc archive decompressed on the fly, for reading as text.
+
+    Both are decoded and newline-translated the same way open(path, 'r')
+    does, so the lexer sees identical source either way.
+    """
+    if path.endswith('.rxc'):
+        return io.TextIOWrapper(io.BufferedReader(DecompressedReader(open(path, 'rb'))))
+    return open(path, 'r')
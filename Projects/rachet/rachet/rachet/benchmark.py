@@ -0,0 +1,943 @@
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from lexer import Lexer, Token, KEYWORDS
+from parser import Parser, Node
+from interpreter import Interpreter, ENGINES
+from bytecode import BytecodeCompiler, BytecodeProgram
+from compiler import Compiler, DB_LINE, decode_db
+from emulator import Emulator
+from peephole import PeepholeOptimizer, Instruction
+
+def generate_program(functions=200):
+    """Generate a large but valid .rx program for benchmarking."""
+    lines = ["use crate::iso;", ""]
+    for i in range(functions):
+        lines.append(f"# helper number {i}")
+        lines.append(f"fn helper_{i}(a, b) {{")
+        lines.append(f"    let x: i32 = a + {i} * 2;")
+        lines.append(f"    let y = (b - {i}) / 3;")
+        lines.append(f"    let label: string = \"helper {i} result\";")
+        lines.append(f"    if (x >= y && not (y == {i})) {{")
+        lines.append(f"        print(label);")
+        lines.append(f"    }} else if (x < 10 || y != 5) {{")
+        lines.append(f"        print(\"small\");")
+        lines.append(f"    }} else {{")
+        lines.append(f"        print(x);")
+        lines.append(f"    }}")
+        lines.append(f"    match (label) {{")
+        lines.append(f"        \"one\", print(\"first\");")
+        lines.append(f"        \"two\", return y;")
+        lines.append(f"    }}")
+        lines.append(f"    return x + y")
+        lines.append("}")
+        lines.append("")
+    lines.append("fn main() {")
+    for i in range(functions):
+        lines.append(f"    let r{i} = helper_{i}({i}, {i + 1});")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+FIB_PROGRAM = """
+fn fib(n) {
+    if (n < 2) {
+        return n
+    }
+    return fib(n - 1) + fib(n - 2)
+}
+
+fn main() {
+    print(fib(N));
+}
+"""
+
+# Many small calls that each end in a return, nested inside if blocks
+CALLS_PROGRAM = """
+fn inc(x) {
+    return x + 1
+}
+
+fn add3(x) {
+    if (x >= 0) {
+        return inc(inc(inc(x)))
+    }
+    return x
+}
+
+fn total(n) {
+    if (n == 0) {
+        return 0
+    }
+    return add3(total(n - 1))
+}
+
+fn repeat(times) {
+    if (times == 0) {
+        return 0
+    }
+    let ignored = total(N);
+    return repeat(times - 1)
+}
+
+fn main() {
+    let result = total(N);
+    let rounds = repeat(50);
+    print(result);
+    print(rounds);
+}
+"""
+
+# Small programs covering each construct, run through every engine and
+# compared against the reference tree walker
+SAMPLE_PROGRAMS = {
+    "arithmetic": """
+fn main() {
+    let x = 5;
+    let y: i32 = 3;
+    print(x + y * 2 - (x - y) / 2);
+    print(x == 5 && y != 5, not x, x < y || y <= 3, x >= 5, x > y);
+}
+""",
+    "strings": """
+fn main() {
+    let s: string = "tab\\there\\\\back\\nline";
+    print(s);
+    print("a", 1, "b");
+}
+""",
+    "branches": """
+fn grade(score) {
+    if (score >= 90) {
+        return "A"
+    } else if (score >= 80) {
+        return "B"
+    } else {
+        print("low score");
+    }
+    return "F"
+}
+
+fn main() {
+    print(grade(95));
+    print(grade(85));
+    print(grade(10));
+}
+""",
+    "match": """
+fn pick(word) {
+    match (word) {
+        "hello", print("You said hello!");
+        "answer", return 42;
+        "7", print("seven");
+    }
+    return 0
+}
+
+fn main() {
+    print(pick("hello"));
+    print(pick("answer"));
+    print(pick(7));
+    print(pick("none"));
+}
+""",
+    "calls": """
+fn add(a, b) {
+    let total = a + b;
+    return total
+}
+
+fn ignore(a) {
+    print(a);
+}
+
+fn main() {
+    print(add(add(1, 2), add(3, 4)));
+    print(ignore("side effect"));
+    print(add(1, 2, 3));
+}
+""",
+    "fib": FIB_PROGRAM.replace("N", "15"),
+    "undefined_variable": """
+fn main() {
+    print("before");
+    print(missing);
+}
+""",
+    "undefined_function": """
+fn main() {
+    print("before");
+    nothing(1);
+}
+""",
+    "calls_heavy": CALLS_PROGRAM.replace("N", "20"),
+    "constants": """
+fn main() {
+    let a = (5 + 3) * 2 - 1;
+    let b = (0 - 7) / 2;
+    let c = 65536 * 65536;
+    print(a, b, c, not 0, 3 > 2 && 1 == 1, 0 || 0);
+    if (1) {
+        print("then kept");
+    } else {
+        print("else dropped");
+    }
+    if (2 < 1) {
+        print("dropped");
+    } else if (a == 15) {
+        print("dynamic else-if kept");
+    } else if (0) {
+        print("dropped too");
+    }
+    if (0) {
+        let hidden = 1;
+    }
+    match ("quit") {
+        "hello", print("no");
+        "quit", print("literal match");
+    }
+    match (7) {
+        "7", print("number match");
+    }
+    match ("none") {
+        "a", print("no");
+    }
+    print(answer());
+}
+
+fn answer() {
+    match ("x") {
+        "x", return 42;
+    }
+    return 0
+}
+""",
+    "inlining": """
+fn first(a, b) {
+    return a
+}
+
+fn twice(x) {
+    return x + x
+}
+
+fn main() {
+    let n = twice(first(4, 9)) * twice(3);
+    print(n);
+    let m = first(1, missing);
+    print(m);
+}
+""",
+    "generated": None,
+}
+
+# Programs limited to what Compiler.codegen supports: print takes a single
+# literal or variable and every called function returns a value
+ASM_PROGRAMS = {
+    "arithmetic": """
+fn main() {
+    let x = 5;
+    let y: i32 = 3;
+    let a = x + y * 2 - (x - y) / 2;
+    let b = (x + 1) * (y + 2) - x * y;
+    let c = 100 / (x - y) + a;
+    print(a);
+    print(b);
+    print(c);
+}
+""",
+    "branches": """
+fn classify(n) {
+    if (n >= 90 && n != 95) {
+        return 1
+    } else if (n > 50 || n == 7) {
+        return 2
+    } else if (not (n < 0)) {
+        return 3
+    }
+    return 4
+}
+
+fn main() {
+    let a = classify(91);
+    let b = classify(95);
+    let c = classify(7);
+    let d = classify(0);
+    let e = classify(0 - 3);
+    print(a);
+    print(b);
+    print(c);
+    print(d);
+    print(e);
+}
+""",
+    "calls": """
+fn add(a, b) {
+    let total = a + b;
+    return total
+}
+
+fn scale(x, factor) {
+    return add(x, 1) * factor
+}
+
+fn main() {
+    let r = add(add(1, 2), add(3, 4));
+    let s = scale(r, 3);
+    print(r);
+    print(s);
+}
+""",
+    "strings": """
+fn main() {
+    let greeting: string = "hello";
+    let count = 3;
+    print("greeting:");
+    print(greeting);
+    print(count);
+}
+""",
+    "match": """
+fn few(word) {
+    match (word) {
+        "yes", return 1;
+        "no", return 2;
+    }
+    return 0
+}
+
+fn many(word) {
+    match (word) {
+        "red", return 1;
+        "green", return 2;
+        "blue", return 3;
+        "cyan", return 4;
+        "red", return 99;
+        "magenta", return 5;
+        "3", return 6;
+    }
+    return 0
+}
+
+fn dense(n) {
+    match (n) {
+        "10", return 1;
+        "11", return 2;
+        "13", return 3;
+        "14", return 4;
+        "12", return 5;
+    }
+    return 0
+}
+
+fn sparse(n) {
+    match (n) {
+        "1", return 1;
+        "100", return 2;
+        "5000", return 3;
+    }
+    return 0
+}
+
+fn main() {
+    let a = few("no");
+    let b = few("maybe");
+    let c = many("red");
+    let d = many("magenta");
+    let e = many("purple");
+    let f = many(3);
+    let g = many("");
+    let h = dense(12);
+    let i = dense(9);
+    let j = dense(15);
+    let k = dense("13");
+    let l = sparse(5000);
+    let m = sparse(2);
+    print(a);
+    print(b);
+    print(c);
+    print(d);
+    print(e);
+    print(f);
+    print(g);
+    print(h);
+    print(i);
+    print(j);
+    print(k);
+    print(l);
+    print(m);
+    match (c) {
+        "1", print("statement arm");
+        "2", print("wrong arm");
+    }
+}
+""",
+    "typed": """
+fn double(n) {
+    return n * 2
+}
+
+fn label(n) {
+    match (n) {
+        2500000, return "large";
+    }
+    return "small"
+}
+
+fn main() {
+    let big = double(1250000);
+    let name: string = label(big);
+    let small: i32 = double(21);
+    print(big);
+    print(name);
+    print(small);
+}
+""",
+    "fib": """
+fn fib(n) {
+    if (n < 2) {
+        return n
+    }
+    return fib(n - 1) + fib(n - 2)
+}
+
+fn main() {
+    let r = fib(N);
+    print(r);
+}
+""".replace("N", "12"),
+}
+
+# (optimize, peephole, registers) settings compared by the asm benchmark
+ASM_CONFIGS = {
+    "baseline": (True, False, False),
+    "peephole": (True, True, False),
+    "registers": (True, True, True),
+}
+
+def compile_to_asm(source, optimize=True, peephole=True, registers=True, inline=True):
+    """Run the Compiler up to codegen (no nasm/ld), returning it for its sections."""
+    compiler = Compiler('benchmark.rx', optimize, peephole, registers, inline=inline)
+    with contextlib.redirect_stdout(io.StringIO()):
+        compiler.compile_source(source)
+    return compiler
+
+def count_instructions(text_asm):
+    return PeepholeOptimizer().count(filter(None, map(Instruction.parse, text_asm.splitlines())))
+
+def data_section_size(data_asm):
+    """Return (labels, bytes) declared by db lines in a data section."""
+    lines = [DB_LINE.match(line) for line in data_asm.splitlines()]
+    contents = [decode_db(match.group(2)) for match in lines if match]
+    return len(contents), sum(len(content) for content in contents if content is not None)
+
+def read_main_program():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.rx')) as f:
+        return f.read()
+
+def emulate(compiler):
+    """Return (output, instructions executed, memory accesses) for compiled code."""
+    emulator = Emulator(compiler.generated_data_asm, compiler.generated_text_asm, compiler.generated_bss_asm)
+    try:
+        output = emulator.run()
+    except Exception as e:
+        output = f"error: {e}\n"
+    return output, emulator.steps, emulator.memory_accesses
+
+def run_reference(source):
+    """Output of the reference tree walker with no AST passes, so a bug in a pass shows up as a difference."""
+    return run_program(source, 'tree', optimize=False, inline=False)[0]
+
+def run_program(source, engine, optimize=True, inline=True):
+    """Run source through one interpreter engine, returning (output, seconds)."""
+    with tempfile.NamedTemporaryFile('w', suffix='.rx', delete=False) as f:
+        f.write(source)
+        path = f.name
+
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            Interpreter(path, engine, optimize, inline).run()
+    except Exception as e:
+        output.write(f"error: {e}\n")
+    finally:
+        elapsed = time.perf_counter() - start
+        os.remove(path)
+    return output.getvalue(), elapsed
+
+def legacy_tokenize(source_code):
+    """The original per-position lexer, kept here as the baseline to beat."""
+    patterns = [(rf'\b({word})\b', kind) for word, kind in KEYWORDS.items()] + [
+        (r'::', 'DOUBLE_COLON'), (r'>=', 'GREATER_EQUAL'), (r'<=', 'LESS_EQUAL'),
+        (r'==', 'EQUAL'), (r'!=', 'NOT_EQUAL'), (r'&&', 'AND'), (r'\|\|', 'OR'),
+        (r'>', 'GREATER'), (r'<', 'LESS'), (r'=', 'ASSIGN'), (r'\+', 'PLUS'),
+        (r'-', 'MINUS'), (r'\*', 'MULTIPLY'), (r'/', 'DIVIDE'), (r':', 'COLON'),
+        (r'\(', 'LPAREN'), (r'\)', 'RPAREN'), (r'\{', 'LBRACE'), (r'\}', 'RBRACE'),
+        (r';', 'SEMICOLON'), (r',', 'COMMA'),
+        (r'"(.*?)"', 'STRING_LITERAL'), (r'\b(\d+)\b', 'NUMBER'), (r'#.*', None),
+        (r'\b([a-zA-Z_][a-zA-Z0-9_]*)\b', 'IDENTIFIER'), (r'\s+', None),
+    ]
+    tokens = []
+    position = 0
+    while position < len(source_code):
+        for pattern, token_type in patterns:
+            m = re.compile(pattern).match(source_code, position)
+            if m:
+                value = m.group(1) if len(m.groups()) > 0 else m.group(0)
+                if token_type:
+                    tokens.append(Token(token_type, value))
+                position = m.end(0)
+                break
+        else:
+            raise Exception(f"Illegal character at position {position}: '{source_code[position]}'")
+    return tokens
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def bench_lexer(functions):
+    source = generate_program(functions)
+    line_count = source.count("\n")
+
+    new_tokens, new_time = timed(lambda: Lexer(source).tokenize())
+    old_tokens, old_time = timed(legacy_tokenize, source)
+
+    same = [(t.type, t.value) for t in new_tokens] == [(t.type, t.value) for t in old_tokens]
+    print(f"Lexing {line_count} lines ({len(new_tokens)} tokens)")
+    print(f"  legacy lexer: {old_time * 1000:10.1f} ms")
+    print(f"  master regex: {new_time * 1000:10.1f} ms")
+    print(f"  speedup:      {old_time / new_time:10.1f}x")
+    print(f"  identical token streams: {same}")
+    return same
+
+def peak_memory(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_stream(functions):
+    source = generate_program(functions)
+
+    # Only the token pipeline is measured; the AST is dropped straight away
+    def list_pipeline():
+        Parser(Lexer(source).tokenize()).parse()
+
+    def stream_pipeline():
+        Parser(Lexer(source).iter_tokens()).parse()
+
+    list_peak = peak_memory(list_pipeline)
+    stream_peak = peak_memory(stream_pipeline)
+    _, list_time = timed(list_pipeline)
+    _, stream_time = timed(stream_pipeline)
+
+    print(f"Lexing + parsing {source.count(chr(10))} lines")
+    print(f"  token list:   {list_time * 1000:10.1f} ms  peak {list_peak / 1024:10.1f} KiB")
+    print(f"  token stream: {stream_time * 1000:10.1f} ms  peak {stream_peak / 1024:10.1f} KiB")
+
+class DictNode:
+    """The original dict-backed node layout with a list per node."""
+    def __init__(self, type, value=None, children=None):
+        self.type = type
+        self.value = value
+        self.children = children if children is not None else []
+
+class DictToken:
+    """The original dict-backed token layout."""
+    def __init__(self, type, value=None):
+        self.type = type
+        self.value = value
+
+def clone_tree(node, node_class):
+    return node_class(node.type, node.value, [clone_tree(child, node_class) for child in node.children])
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for child in node.children)
+
+def retained_memory(func, *args):
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        return result, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+def bench_memory(functions):
+    source = generate_program(functions)
+    ast = Parser(Lexer(source).iter_tokens()).parse()
+    nodes = count_nodes(ast)
+
+    # Both layouts are rebuilt from the same AST so values are shared and
+    # only the node objects and their children containers are counted
+    dict_tree, dict_bytes = retained_memory(clone_tree, ast, DictNode)
+    slot_tree, slot_bytes = retained_memory(clone_tree, ast, Node)
+
+    print(f"AST of {source.count(chr(10))} lines: {nodes} nodes")
+    print(f"  dict nodes:    {dict_bytes / nodes:8.1f} bytes/node  ({dict_bytes / 1024:.1f} KiB)")
+    print(f"  slotted nodes: {slot_bytes / nodes:8.1f} bytes/node  ({slot_bytes / 1024:.1f} KiB)")
+
+    tokens = Lexer(source).tokenize()
+    dict_tokens, dict_token_bytes = retained_memory(lambda: [DictToken(t.type, t.value) for t in tokens])
+    slot_tokens, slot_token_bytes = retained_memory(lambda: [Token(t.type, t.value) for t in tokens])
+    print(f"Tokens: {len(tokens)}")
+    print(f"  dict tokens:    {dict_token_bytes / len(tokens):8.1f} bytes/token")
+    print(f"  slotted tokens: {slot_token_bytes / len(tokens):8.1f} bytes/token")
+
+def bench_engines(functions):
+    """Differential check of every engine against the unoptimised tree walker, then timings."""
+    ok = True
+    for name, source in SAMPLE_PROGRAMS.items():
+        if source is None:
+            source = generate_program(functions)
+        expected = run_reference(source)
+        for engine in ENGINES:
+            for passes in (True, False):
+                actual, _ = run_program(source, engine, optimize=passes, inline=passes)
+                if actual != expected:
+                    ok = False
+                    print(f"[!] {name}: {'optimised' if passes else 'unoptimised'} '{engine}' differs from 'tree'")
+                    print(f"    expected: {expected!r}")
+                    print(f"    actual:   {actual!r}")
+
+        # Serialised bytecode must round-trip unchanged
+        try:
+            program = BytecodeCompiler().compile_program(Parser(Lexer(source).iter_tokens()).parse())
+        except Exception:
+            continue
+        if BytecodeProgram.loads(program.dumps()).disassemble() != program.disassemble():
+            ok = False
+            print(f"[!] {name}: bytecode changed after dumps/loads")
+    print(f"Differential check over {len(SAMPLE_PROGRAMS)} programs: {'passed' if ok else 'FAILED'}")
+
+    source = FIB_PROGRAM.replace("N", "20")
+    print("Recursive fib(20):")
+    for engine in ENGINES:
+        _, elapsed = run_program(source, engine)
+        print(f"  {engine:8} {elapsed * 1000:10.1f} ms")
+    return ok
+
+def bench_asm(functions):
+    """Check compiled programs under each codegen setting against the interpreter."""
+    ok = True
+    print(f"{'program':12} {'codegen':10} {'instructions':>12} {'executed':>10} {'memory':>10}")
+    for name, source in ASM_PROGRAMS.items():
+        expected = run_reference(source)
+        for config, settings in ASM_CONFIGS.items():
+            compiler = compile_to_asm(source, *settings)
+            actual, steps, accesses = emulate(compiler)
+            if actual != expected:
+                ok = False
+                print(f"[!] {name}: '{config}' output differs from the interpreter")
+                print(f"    expected: {expected!r}")
+                print(f"    actual:   {actual!r}")
+            instructions = count_instructions(compiler.generated_text_asm)
+            print(f"{name:12} {config:10} {instructions:>12} {steps:>10} {accesses:>10}")
+
+    source = generate_program(functions)
+    print(f"Generated program ({functions} functions):")
+    for config, settings in ASM_CONFIGS.items():
+        instructions = count_instructions(compile_to_asm(source, *settings).generated_text_asm)
+        print(f"  {config:10} {instructions:>8} instructions")
+
+    for name, source in (("main.rx", read_main_program()), ("generated", source)):
+        labels, size = data_section_size(compile_to_asm(source).generated_data_asm)
+        print(f"{name} data section: {labels} labels, {size} bytes")
+    print(f"Compiled output check over {len(ASM_PROGRAMS)} programs: {'passed' if ok else 'FAILED'}")
+    return ok
+
+SECTIONS = ("generated_data_asm", "generated_text_asm", "generated_bss_asm")
+
+def reproducible_programs(functions):
+    return dict(ASM_PROGRAMS, **{"main.rx": read_main_program(), "generated": generate_program(functions)})
+
+def compiled_sections(functions):
+    """Sections of every program under each codegen setting, as {name: {config: [sections]}}."""
+    return {name: {config: [getattr(compile_to_asm(source, *settings), section) for section in SECTIONS]
+                   for config, settings in ASM_CONFIGS.items()}
+            for name, source in reproducible_programs(functions).items()}
+
+def compiled_sections_in_child(functions, hash_seed):
+    """compiled_sections from a fresh interpreter, so set and dict order use another string hash."""
+    code = f"import json, sys; from benchmark import compiled_sections; json.dump(compiled_sections({functions}), sys.stdout)"
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed))
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Compiling with PYTHONHASHSEED={hash_seed} failed:\n{result.stderr}")
+    return json.loads(result.stdout)
+
+def bench_reproducible(functions):
+    """Compile every program under each codegen setting here and in two processes with other hash seeds, and diff the sections."""
+    expected = compiled_sections(functions)
+    runs = [("a second compile", compiled_sections(functions))]
+    runs += [(f"PYTHONHASHSEED={seed}", compiled_sections_in_child(functions, seed)) for seed in (1, 2)]
+    ok = True
+    for name, configs in expected.items():
+        for config, sections in configs.items():
+            for label, actual in runs:
+                for section, first, second in zip(SECTIONS, sections, actual[name][config]):
+                    if first != second:
+                        ok = False
+                        print(f"[!] {name}: '{config}' {section} differs under {label}")
+    print(f"Reproducibility check over {len(expected)} programs: {'passed' if ok else 'FAILED'}")
+    return ok
+
+class ConcatCompiler(Compiler):
+    """The original emitter: every fragment is appended with str +=."""
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.text = self.data = self.bss = ""
+
+    def emit(self, code):
+        self.text += code
+
+    def emit_data(self, code):
+        self.data += code
+
+    def emit_bss(self, code):
+        self.bss += code
+
+def time_codegen(compiler_class, source):
+    compiler = compiler_class('benchmark.rx', True, False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, elapsed = timed(compiler.compile_source, source)
+    return elapsed
+
+def bench_codegen(functions):
+    """Time lexing, parsing and codegen (no peephole, nasm or ld) as programs grow."""
+    print(f"{'lines':>8} {'str +=':>12} {'fragments':>12} {'per 1k lines':>14}")
+    for scale in (1, 2, 4, 8):
+        source = generate_program(functions * scale)
+        lines = source.count("\n")
+        concat_time = time_codegen(ConcatCompiler, source)
+        fragment_time = time_codegen(Compiler, source)
+        print(f"{lines:>8} {concat_time * 1000:>9.1f} ms {fragment_time * 1000:>9.1f} ms {fragment_time * 1000000 / lines:>11.2f} ms")
+
+def generate_match_program(arms):
+    """A function matching one of arms strings, called once per arm."""
+    lines = ["fn pick(word) {", "    match (word) {"]
+    lines += [f'        "word_{i}", return {i};' for i in range(arms)]
+    lines += ["    }", "    return 0", "}", "", "fn main() {"]
+    lines += [f'    let r{i} = pick("word_{i}");' for i in range(arms)]
+    lines += [f"    print(r{arms - 1});", "}"]
+    return "\n".join(lines) + "\n"
+
+def bench_match(arms):
+    """Compiled and interpreted match dispatch over a wide string match."""
+    import compiler as compiler_module
+    source = generate_match_program(arms)
+    expected = run_reference(source)
+
+    print(f"Match with {arms} arms, each selected once:")
+    hashed = emulate(compile_to_asm(source))
+    threshold = compiler_module.HASH_DISPATCH_MIN_ARMS
+    compiler_module.HASH_DISPATCH_MIN_ARMS = arms + 1
+    try:
+        linear = emulate(compile_to_asm(source))
+    finally:
+        compiler_module.HASH_DISPATCH_MIN_ARMS = threshold
+    print(f"  compiled, compare chain: {linear[1]:>8} instructions executed")
+    print(f"  compiled, hash table:    {hashed[1]:>8} instructions executed")
+    best_of_three(source)
+
+    ok = hashed[0] == linear[0] == expected
+    print(f"  output matches the interpreter: {ok}")
+    return ok
+
+def best_of_three(source):
+    for engine in ENGINES:
+        best = min(run_program(source, engine)[1] for _ in range(3))
+        print(f"  {engine:8} {best * 1000:10.1f} ms")
+
+def bench_recursion(n):
+    """Best of three runs of a recursive fib(n) on every engine."""
+    print(f"Recursive fib({n}), best of 3:")
+    best_of_three(FIB_PROGRAM.replace("N", str(n)))
+
+def bench_calls(n):
+    """Best of three runs of a program made of small returning calls."""
+    print(f"Call-heavy program ({n} deep, 51 rounds), best of 3:")
+    best_of_three(CALLS_PROGRAM.replace("N", str(n)))
+
+def bench_inline(n):
+    """The call-heavy program with and without inlining, interpreted and compiled."""
+    source = CALLS_PROGRAM.replace("N", str(n))
+    expected = run_reference(source)
+    ok = True
+    print(f"Call-heavy program ({n} deep, 51 rounds), best of 3:")
+    print(f"  {'engine':8} {'calls':>10} {'inlined':>10}")
+    for engine in ENGINES:
+        times = []
+        for inline in (False, True):
+            output, _ = run_program(source, engine, inline=inline)
+            ok = ok and output == expected
+            times.append(min(run_program(source, engine, inline=inline)[1] for _ in range(3)))
+        print(f"  {engine:8} {times[0] * 1000:>7.1f} ms {times[1] * 1000:>7.1f} ms")
+
+    compiled = [emulate(compile_to_asm(source, inline=inline)) for inline in (False, True)]
+    ok = ok and all(output == expected for output, _, _ in compiled)
+    print(f"  compiled {compiled[0][1]:>10} {compiled[1][1]:>10} instructions executed")
+    print(f"  output matches the unoptimised interpreter: {ok}")
+    return ok
+
+TAIL_PROGRAM = """
+fn count(n, total) {
+    if (n == 0) {
+        return total
+    }
+    return count(n - 1, total + n)
+}
+
+fn ping(n) {
+    if (n == 0) {
+        return "done"
+    }
+    return pong(n - 1)
+}
+
+fn pong(n) {
+    return ping(n)
+}
+
+fn main() {
+    let total = count(N, 0);
+    let word = ping(N);
+    print(total);
+    print(word);
+}
+"""
+
+# f is called with fewer arguments than it declares, so a tail call passing
+# two would overwrite main's frame instead of f's argument slots
+TAIL_SHORT_PROGRAM = """
+fn g(a, b) {
+    let s = a + b;
+    return s
+}
+
+fn f(a, b) {
+    return g(a, 5)
+}
+
+fn main() {
+    let y = 7;
+    if (f(1) == 6) {
+        print(y);
+    }
+}
+"""
+
+def bench_tail(n):
+    """Tail recursion n deep, past Python's recursion limit, on every engine and compiled."""
+    source = TAIL_PROGRAM.replace("N", str(n))
+    expected = f"{n * (n + 1) // 2}\ndone\n"
+    ok = True
+    print(f"Tail recursion {n} deep:")
+    for engine in ENGINES:
+        output, elapsed = run_program(source, engine)
+        ok = ok and output == expected
+        print(f"  {engine:8} {elapsed * 1000:10.1f} ms  {'ok' if output == expected else repr(output[-60:])}")
+
+    # The compiled stack must not grow with n
+    stack_sizes = []
+    for depth in (n, 2 * n):
+        compiler = compile_to_asm(TAIL_PROGRAM.replace("N", str(depth)))
+        emulator = Emulator(compiler.generated_data_asm, compiler.generated_text_asm, compiler.generated_bss_asm)
+        output = emulator.run()
+        ok = ok and output == f"{depth * (depth + 1) // 2}\ndone\n"
+        stack_sizes.append(emulator.stack_bytes)
+        print(f"  compiled {depth:>8} deep: {emulator.steps:>9} instructions, {emulator.stack_bytes:>5} bytes of stack")
+    ok = ok and stack_sizes[0] == stack_sizes[1]
+
+    # A caller that pushes fewer arguments must keep its frame
+    expected = run_reference(TAIL_SHORT_PROGRAM)
+    for config, settings in ASM_CONFIGS.items():
+        for inline in (False, True):
+            output = emulate(compile_to_asm(TAIL_SHORT_PROGRAM, *settings, inline=inline))[0]
+            if output != expected:
+                ok = False
+                print(f"[!] fewer arguments: '{config}' (inline={inline}) printed {output!r}, expected {expected!r}")
+    print(f"  output matches and the stack stays flat: {ok}")
+    return ok
+
+STARTUP_PROGRAM = """use crate::bin;
+
+fn main() {
+    let x = 6 * 7;
+    print(x);
+}
+"""
+
+def bench_startup(runs):
+    """Nested flywheel -> gears -> compiler.py processes against an in-process build()."""
+    from build import build
+
+    # The old chain: flywheel spawned gears.py, which spawned compiler.py
+    compiler_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiler.py")
+    nested = [sys.executable, "-c",
+              "import subprocess, sys; sys.exit(subprocess.run(sys.argv[1:], cwd=sys.argv[-1]).returncode)"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        program = os.path.join(directory, "startup.rx")
+        with open(program, "w") as f:
+            f.write(STARTUP_PROGRAM)
+        spawn = nested + [sys.executable, compiler_path, program, "--no-cache", os.path.dirname(compiler_path)]
+
+        def nested_build():
+            subprocess.run(spawn, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        def direct_build():
+            # Without nasm installed both paths stop at the same failed link
+            with contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    build(program, use_cache=False)
+                except Exception:
+                    pass
+
+        direct_build()  # Imports and command modules, paid once per process
+        nested_time = min(timed(nested_build)[1] for _ in range(runs))
+        direct_time = min(timed(direct_build)[1] for _ in range(runs))
+
+    print(f"Best of {runs} builds of a small program (includes nasm/ld when installed):")
+    print(f"  nested subprocesses {nested_time * 1000:>9.1f} ms")
+    print(f"  in-process build()  {direct_time * 1000:>9.1f} ms  ({nested_time / direct_time:.1f}x faster)")
+
+BENCHMARKS = {
+    "lex": bench_lexer,
+    "stream": bench_stream,
+    "memory": bench_memory,
+    "engines": bench_engines,
+    "fib": bench_recursion,
+    "calls": bench_calls,
+    "inline": bench_inline,
+    "tail": bench_tail,
+    "asm": bench_asm,
+    "reproducible": bench_reproducible,
+    "codegen": bench_codegen,
+    "match": bench_match,
+    "startup": bench_startup,
+}
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print("Usage: python benchmark.py <" + "|".join(BENCHMARKS) + "> [size]")
+        sys.exit(1)
+
+    # Number of generated functions, or n for the fib benchmark
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else {"fib": 22, "calls": 100, "inline": 100, "tail": 20000, "codegen": 50, "match": 64, "startup": 5}.get(sys.argv[1], 200)
+    ok = BENCHMARKS[sys.argv[1]](size)
+    sys.exit(0 if ok is not False else 1)
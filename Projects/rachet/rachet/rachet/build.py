@@ -0,0 +1,37 @@
+import os
+import sys
+
+from compiler import Compiler
+
+RACHET_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def build(path, output_type=None, optimize=True, peephole=True, registers=True, use_cache=True, separate=True,
+          build_dir=None, output_path=RACHET_DIR, inline=True):
+    """Compile and link a .rx file in this process, returning the path of the image.
+
+    Does what `python compiler.py <path>` does without starting another
+    interpreter, so callers that already imported the toolchain skip the
+    startup and import cost. output_type ('iso' or 'bin') overrides the
+    program's use statement. Intermediate files go to build_dir (a fresh
+    temporary directory by default) and the image to output_path, by
+    default main.<type> in the toolchain directory like compiler.py, so
+    builds with their own directories can run side by side.
+    """
+    compiler = Compiler(os.path.abspath(path), optimize=optimize, peephole=peephole, registers=registers,
+                        use_cache=use_cache, separate=separate, output_type=output_type, inline=inline)
+    output = compiler.run(build_dir, output_path)
+    if output is None:
+        reason = compiler.errors[-1] if compiler.errors else "see the output above"
+        raise Exception(f"Build of '{path}' failed: {reason}")
+    return os.path.abspath(output)
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python build.py <source_file.rx> [iso|bin]")
+        sys.exit(1)
+
+    try:
+        print(f"Built {build(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)}")
+    except Exception as e:
+        print(f"Build error: {e}")
+        sys.exit(1)
@@ -0,0 +1,83 @@
+import functools
+import hashlib
+import os
+import shutil
+import glob
+import uuid
+
+RACHET_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Override with RACHET_CACHE_DIR, e.g. to keep the cache next to a project
+CACHE_DIR = os.environ.get("RACHET_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "rachet")
+
+OUTPUT_NAMES = ("main.iso", "main.bin")
+
+# The modules a build runs through; benchmarks and tools such as reset.py
+# are left out so editing them keeps the cache
+TOOLCHAIN_MODULES = ("lexer", "parser", "resolver", "typeinfer", "inliner", "optimizer", "peephole",
+                     "compiler", "linker", "registry", "bytecode", "closures", "archive")
+
+def toolchain_files():
+    """Every file whose contents can change what a build produces."""
+    patterns = [f"{module}.py" for module in TOOLCHAIN_MODULES]
+    patterns += ["linker.ld", os.path.join("commands", "*.py"), os.path.join("runtimes", "*.asm")]
+    files = []
+    for pattern in patterns:
+        files.extend(glob.glob(os.path.join(RACHET_DIR, pattern)))
+    return sorted(files)
+
+@functools.lru_cache(maxsize=None)
+def toolchain_digest():
+    """Hash of the compiler, its command modules and the kernel runtime, read once per process."""
+    digest = hashlib.sha256()
+    for path in toolchain_files():
+        digest.update(os.path.relpath(path, RACHET_DIR).replace(os.sep, "/").encode())
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def source_key(source, optimize=True, inline=True, peephole=True, registers=True, separate=True, output_type=None):
+    """Cache key for a whole build: the .rx source bytes, the compiler settings and the toolchain."""
+    digest = hashlib.sha256(toolchain_digest().encode() + b"\0")
+    digest.update(f"optimize={optimize},inline={inline},peephole={peephole},registers={registers},"
+                  f"separate={separate},output={output_type}\0".encode())
+    digest.update(source)
+    return digest.hexdigest()
+
+def text_digest(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def entry_dir(stage, key):
+    return os.path.join(CACHE_DIR, stage, key[:2], key)
+
+def lookup(stage, key, name):
+    """Return the cached file name for key, or None on a miss."""
+    path = os.path.join(entry_dir(stage, key), name)
+    return path if os.path.isfile(path) else None
+
+def store(stage, key, path, name=None):
+    """Copy path into the cache entry for key. Failures only cost the cache."""
+    directory = entry_dir(stage, key)
+    target = os.path.join(directory, name or os.path.basename(path))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        partial = f"{target}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(path, partial)
+        os.replace(partial, target)
+        return True
+    except OSError as e:
+        print(f"[!] Could not store {os.path.basename(path)} in the build cache: {e}")
+        return False
+
+def clear():
+    """Remove every cached build. Returns the number of entries removed."""
+    removed = 0
+    for stage in ("source", "asm", "object"):
+        for entry in glob.glob(os.path.join(CACHE_DIR, stage, "*", "*")):
+            shutil.rmtree(entry, ignore_errors=True)
+            removed += 1
+    return removed
@@ -0,0 +1,482 @@
+import hashlib
+import marshal
+import operator
+from array import array
+
+from buildcache import toolchain_digest
+from closures import unescape_string
+from registry import shared_registry
+from resolver import resolve_program, UNSET
+
+# Opcodes. Every instruction is two ints in the code array: opcode, argument
+LOAD_CONST = 0
+LOAD_LOCAL = 1
+STORE_LOCAL = 2
+BINARY_OP = 3
+COMPARE_OP = 4
+LOGICAL_AND = 5
+LOGICAL_OR = 6
+LOGICAL_NOT = 7
+JUMP = 8
+JUMP_IF_FALSE = 9
+MATCH = 10
+CALL = 11
+CALL_BUILTIN = 12
+RETURN_VALUE = 13
+POP_TOP = 14
+DISCARD_TWO = 15
+LOAD_GLOBAL = 16
+TAIL_CALL = 17
+
+OPCODE_NAMES = {
+    value: name for name, value in globals().items()
+    if name.isupper() and isinstance(value, int)
+}
+
+BINARY_OPS = ['PLUS', 'MINUS', 'MULTIPLY', 'DIVIDE']
+BINARY_FUNCS = [operator.add, operator.sub, operator.mul, operator.floordiv]
+
+COMPARE_OPS = ['EQUAL', 'NOT_EQUAL', 'GREATER', 'GREATER_EQUAL', 'LESS', 'LESS_EQUAL']
+COMPARE_FUNCS = [operator.eq, operator.ne, operator.gt, operator.ge, operator.lt, operator.le]
+
+MAGIC = b'RXB3'
+
+class Function:
+    """A lowered user function: its frame slot layout plus instruction array."""
+    def __init__(self, name, local_names, param_slots, code=None):
+        self.name = name
+        self.local_names = local_names
+        self.param_slots = param_slots
+        self.code = code if code is not None else array('i')
+
+class BytecodeProgram:
+    """Flat bytecode for a whole Program AST with shared constant pools."""
+    def __init__(self):
+        self.functions = {}
+        self.constants = []   # Literal values
+        self.names = []       # Global variable names
+        self.calls = []       # (function name, argument count) per call site
+        self.match_tables = []  # ({case value: target}, default target)
+
+    def dumps(self, source_hash=''):
+        functions = {
+            name: (func.local_names, func.param_slots, func.code.tobytes())
+            for name, func in self.functions.items()
+        }
+        payload = (source_hash, functions, self.constants, self.names, self.calls, self.match_tables)
+        return MAGIC + marshal.dumps(payload)
+
+    @classmethod
+    def loads(cls, data, source_hash=None):
+        """Rebuild a program from dumps(); returns None if stale or invalid."""
+        if not data.startswith(MAGIC):
+            return None
+        try:
+            stored_hash, functions, constants, names, calls, match_tables = marshal.loads(data[len(MAGIC):])
+        except (EOFError, ValueError, TypeError):
+            return None
+        if source_hash is not None and stored_hash != source_hash:
+            return None
+
+        program = cls()
+        for name, (local_names, param_slots, code_bytes) in functions.items():
+            code = array('i')
+            code.frombytes(code_bytes)
+            program.functions[name] = Function(name, tuple(local_names), tuple(param_slots), code)
+        program.constants = constants
+        program.names = names
+        program.calls = [tuple(call) for call in calls]
+        program.match_tables = [tuple(table) for table in match_tables]
+        return program
+
+    def disassemble(self):
+        lines = []
+        for func in self.functions.values():
+            params = [func.local_names[slot] for slot in func.param_slots]
+            lines.append(f"fn {func.name}({', '.join(params)}):")
+            code = func.code
+            for pc in range(0, len(code), 2):
+                op, arg = code[pc], code[pc + 1]
+                detail = ''
+                if op == LOAD_CONST:
+                    detail = repr(self.constants[arg])
+                elif op in (LOAD_LOCAL, STORE_LOCAL):
+                    detail = func.local_names[arg]
+                elif op == LOAD_GLOBAL:
+                    detail = self.names[arg]
+                elif op == BINARY_OP:
+                    detail = BINARY_OPS[arg]
+                elif op == COMPARE_OP:
+                    detail = COMPARE_OPS[arg]
+                elif op in (CALL, CALL_BUILTIN, TAIL_CALL):
+                    detail = f"{self.calls[arg][0]}/{self.calls[arg][1]}"
+                lines.append(f"  {pc:5d} {OPCODE_NAMES[op]:14} {arg:5d} {detail}")
+        return "\n".join(lines)
+
+def source_digest(source_code, optimize=True, inline=True):
+    """Key a .rxb is stored under: the source, the AST passes it was built
+    with and the toolchain, so a changed compiler or VM recompiles it"""
+    digest = hashlib.sha256(toolchain_digest().encode())
+    digest.update(f"optimize={optimize},inline={inline}\0".encode())
+    digest.update(source_code.encode('utf-8'))
+    return digest.hexdigest()
+
+def save_bytecode(program, path, source_hash=''):
+    with open(path, 'wb') as f:
+        f.write(program.dumps(source_hash))
+
+def load_bytecode(path, source_hash=None):
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    return BytecodeProgram.loads(data, source_hash)
+
+class BytecodeCompiler:
+    """Lowers a Program AST into a BytecodeProgram."""
+
+    def __init__(self):
+        self.program = BytecodeProgram()
+        self.constant_index = {}
+        self.name_index = {}
+        self.code = None
+
+    def compile_program(self, node):
+        layouts = resolve_program(node)
+        for child in node.children:
+            if child.type == 'FunctionDeclaration':
+                layout = layouts[child.value]
+                func = Function(child.value, tuple(layout.names), tuple(layout.param_slots))
+                self.program.functions[child.value] = func
+                self.code = func.code
+                self.compile_statement(child.children[0])
+                # Falling off the end of a function returns None
+                self.emit(LOAD_CONST, self.constant(None))
+                self.emit(RETURN_VALUE)
+
+        if 'main' not in self.program.functions:
+            raise Exception("No main function found")
+        return self.program
+
+    def emit(self, op, arg=0):
+        self.code.append(op)
+        self.code.append(arg)
+        return len(self.code) - 2
+
+    def patch(self, position, target):
+        self.code[position + 1] = target
+
+    def here(self):
+        return len(self.code)
+
+    def constant(self, value):
+        # Keyed by type too so 1 and True or "1" never share a slot
+        key = (type(value), value)
+        if key not in self.constant_index:
+            self.constant_index[key] = len(self.program.constants)
+            self.program.constants.append(value)
+        return self.constant_index[key]
+
+    def name(self, value):
+        if value not in self.name_index:
+            self.name_index[value] = len(self.program.names)
+            self.program.names.append(value)
+        return self.name_index[value]
+
+    def compile_statement(self, node):
+        node_type = node.type
+
+        if node_type == 'Block':
+            for statement in node.children:
+                self.compile_statement(statement)
+
+        elif node_type == 'VariableDeclaration':
+            self.compile_expression(node.children[0])
+            self.emit(STORE_LOCAL, node.slot)
+
+        elif node_type == 'IfStatement':
+            self.compile_expression(node.children[0])
+            jump_else = self.emit(JUMP_IF_FALSE)
+            self.compile_statement(node.children[1])
+            if len(node.children) > 2:
+                jump_end = self.emit(JUMP)
+                self.patch(jump_else, self.here())
+                self.compile_statement(node.children[2])
+                self.patch(jump_end, self.here())
+            else:
+                self.patch(jump_else, self.here())
+
+        elif node_type == 'MatchStatement':
+            self.compile_expression(node.children[0])
+            table_index = len(self.program.match_tables)
+            self.program.match_tables.append(None)
+            self.emit(MATCH, table_index)
+
+            targets = {}
+            end_jumps = []
+            for case in node.children[1:]:
+                if case.type != 'MatchCase':
+                    continue
+                # The first arm with a given value wins, as in Interpreter.execute
+                targets.setdefault(str(case.value), self.here())
+                self.compile_statement(case.children[0])
+                end_jumps.append(self.emit(JUMP))
+
+            end = self.here()
+            for jump in end_jumps:
+                self.patch(jump, end)
+            self.program.match_tables[table_index] = (targets, end)
+
+        elif node_type == 'ReturnStatement':
+            value = node.children[0] if node.children else None
+            if value is not None and value.type == 'FunctionCall' and value.value not in shared_registry():
+                # `return f(...)` replaces this frame instead of pushing one
+                for arg in value.children:
+                    self.compile_expression(arg)
+                call_index = len(self.program.calls)
+                self.program.calls.append((value.value, len(value.children)))
+                self.emit(TAIL_CALL, call_index)
+                return
+            if value is not None:
+                self.compile_expression(value)
+            else:
+                self.emit(LOAD_CONST, self.constant(None))
+            self.emit(RETURN_VALUE)
+
+        else:
+            # Expression statement: evaluate and drop the result
+            self.compile_expression(node)
+            self.emit(POP_TOP)
+
+    def compile_expression(self, node):
+        node_type = node.type
+
+        if node_type == 'Number':
+            self.emit(LOAD_CONST, self.constant(node.value))
+
+        elif node_type == 'StringLiteral':
+            self.emit(LOAD_CONST, self.constant(unescape_string(node.value)))
+
+        elif node_type == 'Variable':
+            if node.slot is None:
+                self.emit(LOAD_GLOBAL, self.name(node.value))
+            else:
+                self.emit(LOAD_LOCAL, node.slot)
+
+        elif node_type == 'BinaryOp':
+            self.compile_expression(node.children[0])
+            self.compile_expression(node.children[1])
+            if node.value in BINARY_OPS:
+                self.emit(BINARY_OP, BINARY_OPS.index(node.value))
+            elif node.value in COMPARE_OPS:
+                self.emit(COMPARE_OP, COMPARE_OPS.index(node.value))
+            elif node.value == 'AND':
+                self.emit(LOGICAL_AND)
+            elif node.value == 'OR':
+                self.emit(LOGICAL_OR)
+            else:
+                self.emit(DISCARD_TWO)
+                self.emit(LOAD_CONST, self.constant(None))
+
+        elif node_type == 'UnaryOp':
+            if node.value == 'NOT':
+                self.compile_expression(node.children[0])
+                self.emit(LOGICAL_NOT)
+            else:
+                self.emit(LOAD_CONST, self.constant(None))
+
+        elif node_type == 'FunctionCall':
+            for arg in node.children:
+                self.compile_expression(arg)
+            call_index = len(self.program.calls)
+            self.program.calls.append((node.value, len(node.children)))
+            self.emit(CALL_BUILTIN if node.value in shared_registry() else CALL, call_index)
+
+        else:
+            self.emit(LOAD_CONST, self.constant(None))
+
+class VirtualMachine:
+    """Runs a BytecodeProgram in a single dispatch loop.
+
+    User calls push a frame onto an explicit frame stack instead of
+    recursing in Python, so deep .rx recursion is bounded by memory only.
+    Tail calls replace the current frame, so they do not grow it at all.
+    """
+
+    def __init__(self, program, interpreter):
+        self.program = program
+        self.interpreter = interpreter
+        self.builtins = interpreter.builtins
+        self.instructions = {name: self.decode(func.code) for name, func in program.functions.items()}
+        self.layouts = {
+            name: (len(func.local_names), func.param_slots, func.local_names)
+            for name, func in program.functions.items()
+        }
+
+    def decode(self, code):
+        """Pre-decode an instruction array into (opcode, operand) pairs.
+
+        The array is the stored form; for the loop, pool indexes are resolved
+        to the values themselves and jump targets to pair indexes up front.
+        """
+        program = self.program
+        decoded = []
+        for pc in range(0, len(code), 2):
+            op, arg = code[pc], code[pc + 1]
+            if op == LOAD_CONST:
+                arg = program.constants[arg]
+            elif op == LOAD_GLOBAL:
+                arg = program.names[arg]
+            elif op == BINARY_OP:
+                arg = BINARY_FUNCS[arg]
+            elif op == COMPARE_OP:
+                arg = COMPARE_FUNCS[arg]
+            elif op in (CALL, CALL_BUILTIN, TAIL_CALL):
+                arg = program.calls[arg]
+            elif op in (JUMP, JUMP_IF_FALSE):
+                arg //= 2
+            elif op == MATCH:
+                targets, default = program.match_tables[arg]
+                arg = ({value: target // 2 for value, target in targets.items()}, default // 2)
+            decoded.append((op, arg))
+        return decoded
+
+    def run(self, func_name='main', args=()):
+        instructions = self.instructions
+        layouts = self.layouts
+        builtins = self.builtins
+        global_scope = self.interpreter.variables
+        unset = UNSET
+
+        code = instructions[func_name]
+        size, param_slots, local_names = layouts[func_name]
+        frame = [unset] * size
+        for slot, value in zip(param_slots, args):
+            frame[slot] = value
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        frames = []
+        pc = 0
+
+        while True:
+            op, arg = code[pc]
+            pc += 1
+
+            if op == LOAD_LOCAL:
+                value = frame[arg]
+                if value is unset:
+                    name = local_names[arg]
+                    if name not in global_scope:
+                        raise Exception(f"Undefined variable: {name}")
+                    value = global_scope[name]
+                push(value)
+            elif op == LOAD_CONST:
+                push(arg)
+            elif op == BINARY_OP:
+                right = pop()
+                push(arg(pop(), right))
+            elif op == COMPARE_OP:
+                right = pop()
+                push(1 if arg(pop(), right) else 0)
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == STORE_LOCAL:
+                frame[arg] = pop()
+            elif op == CALL:
+                name, argc = arg
+                if argc:
+                    call_args = stack[-argc:]
+                    del stack[-argc:]
+                else:
+                    call_args = []
+                if name not in instructions:
+                    raise Exception(f"Undefined function: {name}")
+                frames.append((code, pc, frame, local_names, stack))
+                code = instructions[name]
+                size, param_slots, local_names = layouts[name]
+                frame = [unset] * size
+                for slot, value in zip(param_slots, call_args):
+                    frame[slot] = value
+                stack = []
+                push = stack.append
+                pop = stack.pop
+                pc = 0
+            elif op == TAIL_CALL:
+                name, argc = arg
+                if argc:
+                    call_args = stack[-argc:]
+                    del stack[-argc:]
+                else:
+                    call_args = []
+                if name not in instructions:
+                    raise Exception(f"Undefined function: {name}")
+                code = instructions[name]
+                size, param_slots, local_names = layouts[name]
+                frame = [unset] * size
+                for slot, value in zip(param_slots, call_args):
+                    frame[slot] = value
+                pc = 0
+            elif op == RETURN_VALUE:
+                value = pop()
+                if not frames:
+                    return value
+                code, pc, frame, local_names, stack = frames.pop()
+                push = stack.append
+                pop = stack.pop
+                push(value)
+            elif op == POP_TOP:
+                pop()
+            elif op == JUMP:
+                pc = arg
+            elif op == CALL_BUILTIN:
+                name, argc = arg
+                if argc:
+                    call_args = stack[-argc:]
+                    del stack[-argc:]
+                else:
+                    call_args = []
+                push(builtins[name](call_args))
+            elif op == MATCH:
+                targets, default = arg
+                pc = targets.get(str(pop()), default)
+            elif op == LOGICAL_AND:
+                right = pop()
+                push(1 if pop() and right else 0)
+            elif op == LOGICAL_OR:
+                right = pop()
+                push(1 if pop() or right else 0)
+            elif op == LOGICAL_NOT:
+                push(1 if not pop() else 0)
+            elif op == LOAD_GLOBAL:
+                if arg not in global_scope:
+                    raise Exception(f"Undefined variable: {arg}")
+                push(global_scope[arg])
+            elif op == DISCARD_TWO:
+                pop()
+                pop()
+            else:
+                raise Exception(f"Unknown opcode {op} at {pc - 1}")
+
+if __name__ == '__main__':
+    import sys
+
+    from lexer import Lexer
+    from parser import Parser
+
+    if len(sys.argv) < 2:
+        print("Usage: python bytecode.py <source_file.rx> [output.rxb]")
+        sys.exit(1)
+
+    with open(sys.argv[1], 'r') as f:
+        source = f.read()
+    program = BytecodeCompiler().compile_program(Parser(Lexer(source).iter_tokens()).parse())
+
+    if len(sys.argv) > 2:
+        # Compiled without the inliner or optimizer, as above
+        save_bytecode(program, sys.argv[2], source_digest(source, optimize=False, inline=False))
+        print(f"Wrote {sys.argv[2]}")
+    else:
+        print(program.disassemble())
@@ -0,0 +1,251 @@
+import operator
+
+from resolver import resolve_program, UNSET
+
+# Returned by compiled statements that finished without hitting a return
+NO_RETURN = object()
+
+class TailCall:
+    """Returned by `return f(...)`: the caller's loop runs f in place of the frame"""
+    __slots__ = ('name', 'args')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+ARITHMETIC_OPS = {
+    'PLUS': operator.add,
+    'MINUS': operator.sub,
+    'MULTIPLY': operator.mul,
+    'DIVIDE': operator.floordiv,  # Integer division
+}
+
+COMPARISON_OPS = {
+    'EQUAL': operator.eq,
+    'NOT_EQUAL': operator.ne,
+    'GREATER': operator.gt,
+    'GREATER_EQUAL': operator.ge,
+    'LESS': operator.lt,
+    'LESS_EQUAL': operator.le,
+}
+
+def unescape_string(value):
+    """Remove quotes and handle escape sequences, as Interpreter.execute does"""
+    value = value.strip('"')
+    value = value.replace('\\n', '\n')
+    value = value.replace('\\t', '\t')
+    value = value.replace('\\\\', '\\')
+    value = value.replace('\\"', '"')
+    return value
+
+class ClosureCompiler:
+    """Compiles a Rachet AST once into nested Python closures.
+
+    Every node is turned into a function of the current frame (a list of
+    slot-resolved locals), so running the program no longer re-dispatches
+    on node.type or operator names. Statements return NO_RETURN unless a
+    return was hit.
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.compiled_functions = {}
+        self.function_bodies = {}  # Name -> (new_frame, compiled body), for tail calls
+        self.frame_layouts = {}
+
+    def compile_program(self, node):
+        self.frame_layouts = resolve_program(node)
+        functions = self.interpreter.functions
+        for child in node.children:
+            if child.type == 'FunctionDeclaration':
+                functions[child.value] = child
+
+        if 'main' not in functions:
+            raise Exception("No main function found")
+
+        # Bodies are compiled after every name is known so calls bind directly
+        for name, func_node in functions.items():
+            self.compiled_functions[name] = self.compile_function(func_node)
+
+        main = self.compiled_functions['main']
+        return lambda: main([])
+
+    def compile_function(self, func_node):
+        body = self.compile_statement(func_node.children[0])
+        new_frame = self.frame_layouts[func_node.value].new_frame
+        function_bodies = self.function_bodies
+        function_bodies[func_node.value] = (new_frame, body)
+
+        def call(args):
+            frame = new_frame(args)
+            result = body(frame)
+            # Tail calls loop here instead of nesting Python calls
+            while result.__class__ is TailCall:
+                callee_frame, callee_body = function_bodies[result.name]
+                result = callee_body(callee_frame(result.args))
+            return None if result is NO_RETURN else result
+        return call
+
+    def compile_statement(self, node):
+        node_type = node.type
+
+        if node_type == 'Block':
+            statements = [self.compile_statement(statement) for statement in node.children]
+
+            def block(frame):
+                for statement in statements:
+                    result = statement(frame)
+                    if result is not NO_RETURN:
+                        return result
+                return NO_RETURN
+            return block
+
+        elif node_type == 'VariableDeclaration':
+            slot = node.slot
+            value = self.compile_expression(node.children[0])
+
+            def declare(frame):
+                frame[slot] = value(frame)
+                return NO_RETURN
+            return declare
+
+        elif node_type == 'IfStatement':
+            condition = self.compile_expression(node.children[0])
+            then_block = self.compile_statement(node.children[1])
+            if len(node.children) > 2:
+                else_block = self.compile_statement(node.children[2])
+            else:
+                else_block = lambda frame: NO_RETURN
+
+            def if_statement(frame):
+                if condition(frame):
+                    return then_block(frame)
+                return else_block(frame)
+            return if_statement
+
+        elif node_type == 'MatchStatement':
+            subject = self.compile_expression(node.children[0])
+            cases = {}
+            for case in node.children[1:]:
+                if case.type == 'MatchCase':
+                    cases.setdefault(str(case.value), self.compile_statement(case.children[0]))
+            no_match = lambda frame: NO_RETURN
+
+            def match_statement(frame):
+                return cases.get(str(subject(frame)), no_match)(frame)
+            return match_statement
+
+        elif node_type == 'ReturnStatement':
+            if not node.children:
+                return lambda frame: None
+            value = node.children[0]
+            interpreter = self.interpreter
+            if (value.type == 'FunctionCall' and value.value in interpreter.functions
+                    and value.value not in interpreter.builtins):
+                func_name = value.value
+                args = [self.compile_expression(arg) for arg in value.children]
+                return lambda frame: TailCall(func_name, [arg(frame) for arg in args])
+            return self.compile_expression(value)
+
+        # Expression statements: evaluate for side effects only
+        expression = self.compile_expression(node)
+
+        def expression_statement(frame):
+            expression(frame)
+            return NO_RETURN
+        return expression_statement
+
+    def compile_expression(self, node):
+        node_type = node.type
+
+        if node_type == 'Number':
+            value = node.value
+            return lambda frame: value
+
+        elif node_type == 'StringLiteral':
+            value = unescape_string(node.value)
+            return lambda frame: value
+
+        elif node_type == 'Variable':
+            name = node.value
+            slot = node.slot
+            global_scope = self.interpreter.variables
+
+            if slot is None:
+                def global_variable(frame):
+                    if name in global_scope:
+                        return global_scope[name]
+                    raise Exception(f"Undefined variable: {name}")
+                return global_variable
+
+            def variable(frame):
+                value = frame[slot]
+                if value is not UNSET:
+                    return value
+                if name in global_scope:
+                    return global_scope[name]
+                raise Exception(f"Undefined variable: {name}")
+            return variable
+
+        elif node_type == 'BinaryOp':
+            left = self.compile_expression(node.children[0])
+            right = self.compile_expression(node.children[1])
+            op = node.value
+
+            if op in ARITHMETIC_OPS:
+                func = ARITHMETIC_OPS[op]
+                return lambda frame: func(left(frame), right(frame))
+            elif op in COMPARISON_OPS:
+                func = COMPARISON_OPS[op]
+                return lambda frame: 1 if func(left(frame), right(frame)) else 0
+            elif op == 'AND':
+                # Both sides are always evaluated, matching Interpreter.execute
+                def logical_and(frame):
+                    left_value = left(frame)
+                    right_value = right(frame)
+                    return 1 if left_value and right_value else 0
+                return logical_and
+            elif op == 'OR':
+                def logical_or(frame):
+                    left_value = left(frame)
+                    right_value = right(frame)
+                    return 1 if left_value or right_value else 0
+                return logical_or
+
+            def unknown_op(frame):
+                left(frame)
+                right(frame)
+                return None
+            return unknown_op
+
+        elif node_type == 'UnaryOp':
+            if node.value == 'NOT':
+                operand = self.compile_expression(node.children[0])
+                return lambda frame: 1 if not operand(frame) else 0
+            return lambda frame: None
+
+        elif node_type == 'FunctionCall':
+            return self.compile_call(node)
+
+        return lambda frame: None
+
+    def compile_call(self, node):
+        func_name = node.value
+        args = [self.compile_expression(arg) for arg in node.children]
+        interpreter = self.interpreter
+
+        if func_name in interpreter.builtins:
+            target = interpreter.builtins[func_name]
+        elif func_name in interpreter.functions:
+            compiled_functions = self.compiled_functions
+
+            # Looked up on first call because callees may not be compiled yet
+            def target(values):
+                return compiled_functions[func_name](values)
+        else:
+            def target(values):
+                raise Exception(f"Undefined function: {func_name}")
+
+        def call(frame):
+            return target([arg(frame) for arg in args])
+        return call
@@ -1,23 +1,18 @@
 # commands/cmd_input.py
 
-# Global flag to track if input_buffer has been defined
-_input_buffer_defined = False
+# The compiler reserves each bss label once, however many calls return it
+BSS_SECTION = "input_buffer resb 256\n"
 
-def compile(args):
-    global _input_buffer_defined
-    
-    # Only define the buffer once
-    bss_section = ""
-    if not _input_buffer_defined:
-        bss_section = "input_buffer resb 256\n"
-        _input_buffer_defined = True
-    
+# Type of the value left in eax, used by the compiler's type inference
+RETURN_TYPE = "string"
+
+def compile(args, labels):
     if not args:
         # No prompt, just get input
         return {
             "data": "",
             "text": "push input_buffer\ncall input_thunk\nmov eax, input_buffer\n",
-            "bss": bss_section
+            "bss": BSS_SECTION
         }
     
     arg = args[0]
@@ -27,11 +22,11 @@ def compile(args):
         return {
             "data": "",
             "text": "push eax\ncall print_thunk\npush input_buffer\ncall input_thunk\nmov eax, input_buffer\n",
-            "bss": bss_section
+            "bss": BSS_SECTION
         }
     else:
         return {
             "data": "",
             "text": "push eax\ncall print_thunk\npush input_buffer\ncall input_thunk\nmov eax, input_buffer\n",
-            "bss": bss_section
+            "bss": BSS_SECTION
         }
\ No newline at end of file
@@ -1,6 +1,6 @@
 # commands/cmd_os.py
 
-def compile(args):
+def compile(args, labels):
     command = args[0].value
     
     if command == "shutdown":
@@ -1,6 +1,6 @@
 # commands/cmd_pause.py
 
-def compile(args):
+def compile(args, labels):
     if not args:
         # Default pause of 1000ms
         return {
@@ -1,8 +1,6 @@
 # commands/cmd_print.py
 
-def compile(args):
-    import uuid
-    
+def compile(args, labels):
     if not args:
         return {
             "data": "",
@@ -10,33 +8,44 @@ def compile(args):
         }
     
     arg = args[0]
-    newline_label = f"newline_{uuid.uuid4().hex[:8]}"
+    newline_label = labels("newline")
     
     if arg.type == "StringLiteral":
         text = arg.value.strip('"').replace('\\n', '\n')
-        label = f"str_{uuid.uuid4().hex[:8]}"
+        label = labels("print_str")
         
         return {
             "data": f'{label}: db "{text}",0\n{newline_label}: db 0x0A,0\n',
             "text": f"    push {label}\n    call print_thunk\n    push {newline_label}\n    call print_thunk\n"
         }
+    elif arg.type == "Variable" and arg.value_type == "number":
+        return {
+            "data": f"{newline_label}: db 0x0A,0\n",
+            "text": f"    push dword {arg.asm}\n    call print_number_thunk\n    push {newline_label}\n    call print_thunk\n"
+        }
+    elif arg.type == "Variable" and arg.value_type == "string":
+        return {
+            "data": f"{newline_label}: db 0x0A,0\n",
+            "text": f"    push dword {arg.asm}\n    call print_thunk\n    push {newline_label}\n    call print_thunk\n"
+        }
     elif arg.type == "Variable":
-        # Use the heuristic approach since we can't easily access compiler type info here
-        uuid_hex = uuid.uuid4().hex[:8]
+        # Type could not be inferred, so decide at runtime
+        number_label = labels(".print_as_number")
+        done_label = labels(".print_done")
         return {
             "data": f"{newline_label}: db 0x0A,0\n",
             "text": f"""    mov eax, dword {arg.asm}
     ; Heuristic: if value < 1000000, treat as number; otherwise as string pointer
     cmp eax, 1000000
-    jl .print_as_number_{uuid_hex}
+    jl {number_label}
     ; Treat as string pointer
     push eax
     call print_thunk
-    jmp .done_{uuid_hex}
-.print_as_number_{uuid_hex}:
+    jmp {done_label}
+{number_label}:
     push eax
     call print_number_thunk
-.done_{uuid_hex}:
+{done_label}:
     push {newline_label}
     call print_thunk
 """
@@ -1,5 +1,5 @@
-import importlib.util
 import os
+import re
 import sys
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -7,112 +7,530 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from lexer import Lexer
 from parser import Parser, Node
 from linker import link
+from optimizer import Optimizer
+from inliner import Inliner
+from peephole import PeepholeOptimizer
+from archive import open_source, SOURCE_EXTENSIONS
+from registry import shared_registry
+from typeinfer import TypeInference, NUMBER, STRING
+
+# Callee-saved registers that hold a function's most used locals
+LOCAL_REGISTERS = ['esi', 'edi']
+
+# Caller-saved scratch registers for the left operand of a BinaryOp while
+# its right side is evaluated. ebx stays free for the right operand itself
+TEMPORARY_REGISTERS = ['ecx', 'edx']
+
+SET_CONDITIONS = {
+    'EQUAL': 'sete',
+    'NOT_EQUAL': 'setne',
+    'GREATER': 'setg',
+    'GREATER_EQUAL': 'setge',
+    'LESS': 'setl',
+    'LESS_EQUAL': 'setle',
+}
+
+ESCAPES = {'n': 10, 't': 9, '\\': 92, '"': 34}
+
+DB_LINE = re.compile(r'^\s*([A-Za-z_.][\w.]*):\s*db\s+(.*?)\s*$')
+DB_ITEM = re.compile(r'"[^"]*"|\'[^\']*\'|[^,\s]+')
+
+def decode_db(items):
+    """Return the bytes a db operand list declares, or None if it is not understood"""
+    content = bytearray()
+    for item in DB_ITEM.findall(items):
+        if len(item) >= 2 and item[0] in '"\'' and item[-1] == item[0]:
+            content += item[1:-1].encode()
+        else:
+            try:
+                content.append(int(item, 0) & 0xFF)
+            except ValueError:
+                return None
+    return bytes(content)
+
+def encode_db(content):
+    """Format bytes as db operands, quoting runs of printable characters"""
+    items = []
+    run = ""
+    for byte in content:
+        if 32 <= byte <= 126 and byte != 34:
+            run += chr(byte)
+            continue
+        if run:
+            items.append(f'"{run}"')
+            run = ""
+        items.append(str(byte))
+    if run:
+        items.append(f'"{run}"')
+    return ", ".join(items)
+
+# Values at or above this are treated as string pointers when their type
+# could not be inferred (see cmd_print)
+STRING_POINTER_MIN = 1000000
+
+# Matches with at least this many arms use table dispatch
+JUMP_TABLE_MIN_ARMS = 4
+HASH_DISPATCH_MIN_ARMS = 4
+
+HASH_SEED = 5381
+
+def string_hash(content):
+    """djb2 over bytes, wrapped to 32 bits like the generated hash loop"""
+    value = HASH_SEED
+    for byte in content:
+        value = (value * 33 + byte) & 0xFFFFFFFF
+    return value
+
+def count_declarations(node):
+    if node.type == 'VariableDeclaration':
+        return 1
+    return sum(count_declarations(child) for child in node.children)
+
+def count_returns(node):
+    if node.type == 'ReturnStatement':
+        return 1
+    return sum(count_returns(child) for child in node.children)
+
+def count_uses(node, uses):
+    """Count every Variable node per name, however often it runs"""
+    if node.type == 'Variable':
+        uses[node.value] = uses.get(node.value, 0) + 1
+    for child in node.children:
+        count_uses(child, uses)
+    return uses
+
+def count_call_args(node, arity):
+    """Record the fewest arguments each function is called with"""
+    if node.type == 'FunctionCall' and node.value in arity:
+        arity[node.value] = min(arity[node.value], len(node.children))
+    for child in node.children:
+        count_call_args(child, arity)
+    return arity
+
+def contains_call(node):
+    if node.type == 'FunctionCall':
+        return True
+    return any(contains_call(child) for child in node.children)
 
 class Compiler:
-    def __init__(self, source_file):
-        # Check if file has .rx extension
-        if not source_file.endswith('.rx'):
-            raise Exception(f"Error: Only .rx files are supported. '{source_file}' is not a valid source file.")
+    def __init__(self, source_file, optimize=True, peephole=True, registers=True, use_cache=True, separate=True,
+                 output_type=None, inline=True):
+        # Check if file has .rx extension (or is a compressed .rxc)
+        if not source_file.endswith(SOURCE_EXTENSIONS):
+            raise Exception(f"Error: Only .rx and .rxc files are supported. '{source_file}' is not a valid source file.")
         
         self.source_file = source_file
-        self.generated_text_asm = ""
-        self.generated_data_asm = ""
-        self.generated_bss_asm = ""
-        self.output_type = 'bin'
+        # Sections are collected as lists of fragments and joined once
+        self.text_fragments = []
+        self.data_fragments = []
+        self.bss_fragments = []
+        self.string_pool = {}  # Null-terminated bytes -> data label
+        self.pooled_labels = set()
+        self.output_type = output_type or 'bin'
+        self.requested_output_type = output_type  # Overrides the program's use statement
         self.variables = {}
         self.stack_offset = 0
         self.label_counter = 0
-        self.commands_cache = {}
+        self.label_scope = None  # Function whose labels are being numbered
+        self.commands = shared_registry()
+        self.types = TypeInference()
+        self.bss_labels = set()  # Reserved once however many commands ask for them
+        self.optimize = optimize
+        self.inline = inline  # Expand calls to small helpers in place
+        self.peephole = peephole
+        self.allocate_registers = registers
+        self.use_cache = use_cache  # Reuse objects and images for unchanged assembly
+        self.separate = separate  # One object per function instead of a single temp.asm
+        self.local_registers = {}
+        self.saved_registers = []
+        self.call_arity = {}  # Function name -> fewest arguments any of its callers pushes
+        self.function_name = None  # Function being generated
+        self.live_temporaries = []
+        self.command_args = set()
+        self.errors = []  # Why the last run() returned None
+
+    @property
+    def generated_text_asm(self):
+        return "".join(self.text_fragments)
+
+    @property
+    def generated_data_asm(self):
+        return "".join(self.data_fragments)
+
+    @property
+    def generated_bss_asm(self):
+        return "".join(self.bss_fragments)
+
+    def emit(self, code):
+        self.text_fragments.append(code)
+
+    def emit_data(self, code):
+        self.data_fragments.append(code)
+
+    def emit_bss(self, code):
+        lines = []
+        for line in code.splitlines(keepends=True):
+            label = line.split()[0].rstrip(':') if line.strip() else None
+            if label and label not in self.bss_labels:
+                self.bss_labels.add(label)
+                lines.append(line)
+        self.bss_fragments.append("".join(lines))
+
+    def intern_string(self, content):
+        """Return the data label holding content (bytes), declaring it on first use"""
+        label = self.string_pool.get(content)
+        if label is None:
+            # Named after the content so a function's object does not change
+            # when strings are added elsewhere
+            label = f"str_{string_hash(content):08x}"
+            while label in self.pooled_labels:
+                label += "_"
+            self.string_pool[content] = label
+            self.pooled_labels.add(label)
+            self.emit_data(f"{label}: db {encode_db(content)}\n")
+        return label
+
+    def intern_command_data(self, data, text):
+        """Pool the db strings a command module declared, renaming its labels in text.
+
+        Pooled strings are named after their content like intern_string's,
+        so no function's object refers to a label numbered in another one.
+        """
+        renames = {}
+        kept = []
+        for line in data.splitlines(keepends=True):
+            match = DB_LINE.match(line)
+            content = decode_db(match.group(2)) if match else None
+            if content is None:
+                kept.append(line)
+                continue
+            renames[match.group(1)] = self.intern_string(content)
+
+        if renames:
+            pattern = re.compile(r'\b(' + '|'.join(map(re.escape, renames)) + r')\b')
+            text = pattern.sub(lambda m: renames[m.group(1)], text)
+        return "".join(kept), text
 
     def get_unique_label(self, prefix="label"):
+        # Numbered per function, so editing one function leaves the labels
+        # (and cached object) of the others unchanged
         self.label_counter += 1
+        if self.label_scope:
+            return f"{prefix}_{self.label_scope}_{self.label_counter}"
         return f"{prefix}_{self.label_counter}"
 
-    def load_command(self, command_name):
-        """Load command from commands subfolder"""
-        if command_name in self.commands_cache:
-            return self.commands_cache[command_name]
-            
-        commands_dir = os.path.join(os.path.dirname(__file__), 'commands')
-        command_file = os.path.join(commands_dir, f'cmd_{command_name}.py')
-        
-        if not os.path.exists(command_file):
-            return None
-            
-        try:
-            spec = importlib.util.spec_from_file_location(f"cmd_{command_name}", command_file)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-            self.commands_cache[command_name] = module
-            return module
-        except Exception as e:
-            print(f"Warning: Could not load command '{command_name}': {e}")
-            return None
+    def assign_local_registers(self, params, reads, uses, declared, epilogues):
+        """Map the most read parameters and locals of a function to LOCAL_REGISTERS"""
+        # Reading a register instead of [ebp-N] saves a memory access and a
+        # byte, but never an instruction. The push and each restore cost an
+        # instruction and a memory access when run, and 1 and 3 bytes; a
+        # parameter also needs a 3 byte load and a local that a command
+        # module reads a 2 byte extra store. A register is only used when
+        # the expected reads outweigh the run cost and the reads in the
+        # code outweigh the size cost, so the function gets no larger.
+        # Ties go by name, so the assignment never depends on set order
+        candidates = []
+        for name in sorted(params | declared):
+            if name in params:
+                run_cost, size_cost = 6, 4 + 3 * epilogues
+            elif name in self.command_args:
+                run_cost, size_cost = 5, 3 + 3 * epilogues
+            else:
+                run_cost, size_cost = 4, 1 + 3 * epilogues
+            if reads.get(name, 0) > run_cost and uses.get(name, 0) > size_cost:
+                candidates.append(name)
+        candidates.sort(key=lambda name: (-reads[name], name))
+        return dict(zip(candidates, LOCAL_REGISTERS))
+
+    def count_reads(self, node, weight, reads, declared, command_args):
+        """Count variable reads, halving the weight inside each conditional branch"""
+        if node.type == 'Variable':
+            reads[node.value] = reads.get(node.value, 0) + weight
+        elif node.type == 'VariableDeclaration':
+            declared.add(node.value)
+        elif node.type == 'FunctionCall' and node.value in self.commands:
+            # Command modules read their arguments from the stack slot
+            command_args.update(arg.value for arg in node.children if arg.type == 'Variable')
+            return
+        elif node.type in ('IfStatement', 'MatchStatement'):
+            self.count_reads(node.children[0], weight, reads, declared, command_args)
+            for branch in node.children[1:]:
+                self.count_reads(branch, weight / 2, reads, declared, command_args)
+            return
+        for child in node.children:
+            self.count_reads(child, weight, reads, declared, command_args)
+
+    def operand(self, node):
+        """Return node as an instruction operand if it needs no code, else None"""
+        if node.type == 'Number':
+            return str(node.value)
+        elif node.type == 'Variable' and node.value in self.variables:
+            if node.value in self.local_registers:
+                return self.local_registers[node.value]
+            return f"dword [ebp{self.variables[node.value]:+d}]"
+        return None
+
+    def emit_binary(self, op, left, right):
+        """Combine left and right (registers, memory or immediates) into eax.
+
+        One of the two is always eax; the other is left untouched.
+        """
+        if op in ('PLUS', 'MULTIPLY'):
+            instruction = 'add' if op == 'PLUS' else 'imul'
+            other = right if left == 'eax' else left
+            self.emit(f"{instruction} eax, {other}\n")
+        elif op == 'MINUS':
+            if left == 'eax':
+                self.emit(f"sub eax, {right}\n")
+            else:
+                self.emit(f"sub {left}, eax\nmov eax, {left}\n")
+        elif op == 'DIVIDE':
+            if left != 'eax':
+                self.emit(f"mov ebx, eax\nmov eax, {left}\n")
+            elif right != 'ebx':
+                self.emit(f"mov ebx, {right}\n")
+            # cdq overwrites edx, which may hold an outer temporary
+            if 'edx' in self.live_temporaries:
+                self.emit("push edx\ncdq\nidiv ebx\npop edx\n")
+            else:
+                self.emit("cdq\nidiv ebx\n")
+        elif op in SET_CONDITIONS:
+            self.emit(f"cmp {left}, {right}\n{SET_CONDITIONS[op]} al\nmovzx eax, al\n")
+        elif op in ('AND', 'OR'):
+            if left != 'eax':
+                self.emit(f"mov ebx, eax\nmov eax, {left}\n")
+            elif right != 'ebx':
+                self.emit(f"mov ebx, {right}\n")
+            if op == 'AND':
+                and_false_label = self.get_unique_label("and_false")
+                and_done_label = self.get_unique_label("and_done")
+                self.emit(f"test eax, eax\njz {and_false_label}\ntest ebx, ebx\njz {and_false_label}\nmov eax, 1\njmp {and_done_label}\n{and_false_label}:\nxor eax, eax\n{and_done_label}:\n")
+            else:
+                or_true_label = self.get_unique_label("or_true")
+                or_done_label = self.get_unique_label("or_done")
+                self.emit(f"test eax, eax\njnz {or_true_label}\ntest ebx, ebx\njnz {or_true_label}\nxor eax, eax\njmp {or_done_label}\n{or_true_label}:\nmov eax, 1\n{or_done_label}:\n")
+
+    def emit_number_dispatch(self, arms, no_match_label):
+        """Jump to the arm for the number in eax through a table, or a compare chain when sparse"""
+        if not arms:
+            self.emit(f"jmp {no_match_label}\n")
+            return
+
+        low, high = min(arms), max(arms)
+        span = high - low + 1
+        if len(arms) >= JUMP_TABLE_MIN_ARMS and span <= 2 * len(arms):
+            table_label = self.get_unique_label("match_table")
+            targets = [arms.get(low + i, no_match_label) for i in range(span)]
+            self.emit_data(f"{table_label}: dd {', '.join(targets)}\n")
+            if low:
+                self.emit(f"sub eax, {low}\n")
+            # Values below low wrap around to large unsigned numbers
+            self.emit(f"cmp eax, {span - 1}\nja {no_match_label}\njmp [{table_label} + eax*4]\n")
+        else:
+            for value, arm_label in arms.items():
+                self.emit(f"cmp eax, {value}\nje {arm_label}\n")
+            self.emit(f"jmp {no_match_label}\n")
+
+    def emit_string_dispatch(self, arms, no_match_label):
+        """Jump to the arm for the string eax points to.
+
+        Small matches compare against every case in order. Larger ones hash
+        the subject, jump through a table of hash buckets and only compare
+        against the cases in that bucket.
+        """
+        # string_compare preserves ecx and edx, so the subject stays in edx
+        self.emit("mov edx, eax\n")
+
+        if len(arms) < HASH_DISPATCH_MIN_ARMS:
+            self.emit_string_compares(list(arms.items()), no_match_label)
+            return
+
+        bucket_count = 1
+        while bucket_count < 2 * len(arms):
+            bucket_count *= 2
+        buckets = [[] for _ in range(bucket_count)]
+        for value, arm_label in arms.items():
+            buckets[string_hash(value.encode()) & (bucket_count - 1)].append((value, arm_label))
+
+        hash_loop_label = self.get_unique_label("hash_loop")
+        hash_done_label = self.get_unique_label("hash_done")
+        table_label = self.get_unique_label("match_table")
+        bucket_labels = [self.get_unique_label("match_bucket") if bucket else no_match_label for bucket in buckets]
+        self.emit_data(f"{table_label}: dd {', '.join(bucket_labels)}\n")
+
+        # ecx = hash * 33 + byte over the subject, see string_hash
+        self.emit(f"mov ebx, edx\nmov ecx, {HASH_SEED}\n")
+        self.emit(f"{hash_loop_label}:\nmovzx eax, byte [ebx]\ntest eax, eax\njz {hash_done_label}\n")
+        self.emit(f"imul ecx, 33\nadd ecx, eax\ninc ebx\njmp {hash_loop_label}\n")
+        self.emit(f"{hash_done_label}:\nand ecx, {bucket_count - 1}\njmp [{table_label} + ecx*4]\n")
+
+        for bucket, bucket_label in zip(buckets, bucket_labels):
+            if bucket:
+                self.emit(f"{bucket_label}:\n")
+                self.emit_string_compares(bucket, no_match_label)
 
-    def run(self):
+    def emit_string_compares(self, arms, no_match_label):
+        for value, arm_label in arms:
+            # Null-terminated case string, shared with equal literals
+            case_str_label = self.intern_string(value.encode() + b"\0")
+
+            # string_compare pops both arguments itself (ret 8)
+            self.emit(f"push dword {case_str_label}\npush edx\ncall string_compare\n")
+            self.emit(f"test eax, eax\njnz {arm_label}\n")
+        self.emit(f"jmp {no_match_label}\n")
+
+    def emit_push_args(self, args):
+        """Push call arguments right to left, as cdecl expects"""
+        for arg in reversed(args):
+            operand = self.operand(arg)
+            if operand is not None:
+                if operand.isdigit():
+                    operand = f"dword {operand}"
+                self.emit(f"push {operand}\n")
+            else:
+                self.codegen(arg)
+                self.emit("push eax\n")
+
+    def emit_tail_call(self, node):
+        """Jump to the callee with this frame's argument slots and return address.
+
+        The caller cleans up the arguments it pushed, so the callee may take
+        at most as many as every call site of the current function pushes
+        (see call_arity); more would overwrite the caller's frame. The stack
+        stays flat however deep the tail recursion goes.
+        """
+        self.emit_push_args(node.children)
+        for i in range(len(node.children)):
+            self.emit(f"pop eax\nmov dword [ebp{8 + 4 * i:+d}], eax\n")
+        for i, register in enumerate(self.saved_registers):
+            self.emit(f"mov {register}, dword [ebp{-4 * (i + 1)}]\n")
+        self.emit(f"mov esp, ebp\npop ebp\njmp {node.value}\n")
+
+    def emit_epilogue(self):
+        for i, register in enumerate(self.saved_registers):
+            self.emit(f"mov {register}, dword [ebp{-4 * (i + 1)}]\n")
+        self.emit("mov esp, ebp\npop ebp\nret\n")
+
+    def run(self, build_dir=None, output_path=None):
+        """Compile and link the source file, returning the image path or None on failure"""
         try:
-            with open(self.source_file, 'r') as f:
+            with open_source(self.source_file) as f:
                 source_code = f.read()
         except FileNotFoundError:
-            print(f"Error: Source file '{self.source_file}' not found.")
-            return
+            message = f"Error: Source file '{self.source_file}' not found."
+            print(message)
+            self.errors.append(message)
+            return None
+
+        self.compile_source(source_code)
+
+        print(f"4. Linking and creating main.{self.output_type}...")
+        return link(self.data_fragments, self.text_fragments, self.output_type, self.bss_fragments, self.use_cache, self.separate,
+                    build_dir, output_path, self.errors)
 
+    def compile_source(self, source_code):
+        """Generate the data, text and bss sections for source_code without linking"""
         print("1. Lexing source code...")
         lexer = Lexer(source_code)
-        tokens = lexer.tokenize()
+        tokens = lexer.iter_tokens()
 
         print("2. Parsing tokens into AST...")
         parser = Parser(tokens)
         ast = parser.parse()
 
+        if self.inline:
+            inliner = Inliner()
+            ast = inliner.inline(ast)
+            print(f"   Inlined {inliner.inlined} call(s)")
+
+        if self.optimize:
+            optimizer = Optimizer()
+            ast = optimizer.optimize(ast)
+            print(f"   Optimised AST: folded {optimizer.folded} expression(s), pruned {optimizer.pruned} branch(es), removed {optimizer.nodes_removed} node(s)")
+
+        self.types.infer(ast)
+        typed, total = self.types.count()
+        print(f"   Inferred types: {typed} of {total} variable(s)")
+
         # Check for use statement to determine output type
         for child in ast.children:
-            if child.type == 'UseStatement':
+            if child.type == 'UseStatement' and not self.requested_output_type:
                 self.output_type = child.value
                 break
         
         print("3. Generating assembly code from AST...")
         self.codegen(ast)
-        
-        print(f"4. Linking and creating main.{self.output_type}...")
-        link(self.generated_data_asm, self.generated_text_asm, self.output_type, self.generated_bss_asm)
+
+        if self.peephole:
+            peephole = PeepholeOptimizer()
+            self.text_fragments = [peephole.optimize(self.generated_text_asm)]
+            print(f"   Peephole: {peephole.instructions_before} -> {peephole.instructions_after} instruction(s)")
 
     def codegen(self, node):
         if node.type == 'Program':
+            # The kernel calls main with no arguments, and functions that are
+            # never called get no argument slots to reuse
+            arity = {child.value: float('inf') for child in node.children if child.type == 'FunctionDeclaration'}
+            count_call_args(node, arity)
+            self.call_arity = {name: 0 if name == 'main' or count == float('inf') else count
+                               for name, count in arity.items()}
             for child in node.children:
                 self.codegen(child)
         elif node.type == 'FunctionDeclaration':
-            self.generated_text_asm += f"global {node.value}\n{node.value}:\n"
-            if node.value == 'main':
-                self.generated_text_asm += "push ebp\nmov ebp, esp\n"
-                old_stack_offset = self.stack_offset
-                old_variables = self.variables.copy()
-                self.stack_offset = 0
-                self.variables = {}
-                self.codegen(node.children[0])
-                self.generated_text_asm += "mov esp, ebp\npop ebp\nret\n"
-                self.stack_offset = old_stack_offset
-                self.variables = old_variables
+            self.emit(f"global {node.value}\n{node.value}:\n")
+            self.label_scope = node.value
+            self.label_counter = 0
+            self.emit("push ebp\nmov ebp, esp\n")
+
+            old_stack_offset = self.stack_offset
+            old_variables = self.variables.copy()
+            old_local_registers = self.local_registers
+            old_saved_registers = self.saved_registers
+            self.variables = {}
+
+            # Handle function parameters (main takes none)
+            params = node.children[1:] if node.value != 'main' else []
+            self.function_name = node.value
+
+            # Set up parameters as local variables
+            param_offset = 8
+            for param in params:
+                self.variables[param.value] = param_offset
+                param_offset += 4
+
+            # Hot locals live in callee-saved registers, pushed right below ebp
+            reads = {}
+            declared = set()
+            self.command_args = set()
+            self.count_reads(node.children[0], 1.0, reads, declared, self.command_args)
+            if self.allocate_registers:
+                # One epilogue per return plus the one at the end of the body
+                epilogues = count_returns(node.children[0]) + 1
+                self.local_registers = self.assign_local_registers({param.value for param in params}, reads,
+                                                                   count_uses(node.children[0], {}), declared, epilogues)
             else:
-                # Handle function parameters
-                params = node.children[1:] if len(node.children) > 1 else []
-                self.generated_text_asm += "push ebp\nmov ebp, esp\n"
-                
-                old_stack_offset = self.stack_offset
-                old_variables = self.variables.copy()
-                self.stack_offset = 0
-                
-                # Set up parameters as local variables
-                param_offset = 8
-                for param in params:
-                    self.variables[param.value] = param_offset
-                    param_offset += 4
-                
-                self.codegen(node.children[0])
-                self.generated_text_asm += "mov esp, ebp\npop ebp\nret\n"
-                
-                self.stack_offset = old_stack_offset
-                self.variables = old_variables
+                self.local_registers = {}
+            self.saved_registers = sorted(set(self.local_registers.values()))
+            for register in self.saved_registers:
+                self.emit(f"push {register}\n")
+            self.stack_offset = 4 * len(self.saved_registers)
+
+            # The whole frame is reserved up front instead of per declaration
+            frame_size = 4 * count_declarations(node.children[0])
+            if frame_size:
+                self.emit(f"sub esp, {frame_size}\n")
+
+            for param in params:
+                if param.value in self.local_registers:
+                    self.emit(f"mov {self.local_registers[param.value]}, dword [ebp{self.variables[param.value]:+d}]\n")
+
+            self.codegen(node.children[0])
+            self.emit_epilogue()
+
+            self.stack_offset = old_stack_offset
+            self.variables = old_variables
+            self.local_registers = old_local_registers
+            self.saved_registers = old_saved_registers
         elif node.type == 'Block':
             for statement in node.children:
                 self.codegen(statement)
@@ -124,154 +542,134 @@ class Compiler:
             # Generate code for the expression
             self.codegen(node.children[0])
             
-            # Store result in variable
-            self.generated_text_asm += f"sub esp, 4\nmov dword [ebp{self.variables[var_name]}], eax\n"
+            # Store result in variable. The stack slot stays current for
+            # command modules, which read arguments through arg.asm
+            if var_name in self.local_registers:
+                self.emit(f"mov {self.local_registers[var_name]}, eax\n")
+            if var_name not in self.local_registers or var_name in self.command_args:
+                self.emit(f"mov dword [ebp{self.variables[var_name]}], eax\n")
         elif node.type == 'IfStatement':
             else_label = self.get_unique_label("else")
             end_label = self.get_unique_label("endif")
             
             # Generate condition
             self.codegen(node.children[0])
-            self.generated_text_asm += f"test eax, eax\njz {else_label}\n"
+            self.emit(f"test eax, eax\njz {else_label}\n")
             
             # Generate then block
             self.codegen(node.children[1])
-            self.generated_text_asm += f"jmp {end_label}\n{else_label}:\n"
+            self.emit(f"jmp {end_label}\n{else_label}:\n")
             
             # Generate else block if present
             if len(node.children) > 2:
                 self.codegen(node.children[2])
             
-            self.generated_text_asm += f"{end_label}:\n"
+            self.emit(f"{end_label}:\n")
         elif node.type == 'MatchStatement':
             var_expr = node.children[0]
             end_label = self.get_unique_label("match_end")
-            
-            # Generate code to get the variable value
+            no_match_label = self.get_unique_label("match_none")
+            string_label = self.get_unique_label("match_string")
+            cases = node.children[1:]
+            arm_labels = [self.get_unique_label("match_arm") for _ in cases]
+
+            # Equal case values keep the first arm, as in the interpreter
+            string_arms = {}
+            number_arms = {}
+            for case, arm_label in zip(cases, arm_labels):
+                value = str(case.value)
+                string_arms.setdefault(value, arm_label)
+                if value.lstrip('-').isdigit() and str(int(value)) == value:
+                    number_arms.setdefault(int(value), arm_label)
+
+            # Generate code to get the variable value. Only the dispatch for
+            # its inferred type is emitted; otherwise small values are numbers
+            # and larger ones string pointers, the same split cmd_print makes
             self.codegen(var_expr)
-            self.generated_text_asm += "push eax\n"  # Save the string pointer
-            
-            for i, case in enumerate(node.children[1:]):
-                next_case_label = self.get_unique_label(f"next_case_{i}")
-                
-                # Create string literal for comparison
-                case_str_label = self.get_unique_label("case_str")
-                
-                # Convert case value to null-terminated string
-                case_string = f'"{case.value}",0'
-                self.generated_data_asm += f"{case_str_label}: db {case_string}\n"
-                
-                # Compare strings
-                self.generated_text_asm += f"mov eax, [esp]\n"  # Get saved string pointer
-                self.generated_text_asm += f"push dword {case_str_label}\n"
-                self.generated_text_asm += f"push eax\n"
-                self.generated_text_asm += f"call string_compare\n"
-                self.generated_text_asm += f"add esp, 8\n"
-                self.generated_text_asm += f"test eax, eax\n"
-                self.generated_text_asm += f"jz {next_case_label}\n"
-                
-                # Execute case action - clean up stack first
-                self.generated_text_asm += f"add esp, 4\n"  # Remove saved pointer
+            subject_type = self.types.type_of(var_expr, self.label_scope)
+            if subject_type == NUMBER:
+                self.emit_number_dispatch(number_arms, no_match_label)
+            elif subject_type == STRING:
+                self.emit_string_dispatch(string_arms, no_match_label)
+            else:
+                self.emit(f"cmp eax, {STRING_POINTER_MIN}\njge {string_label}\n")
+                self.emit_number_dispatch(number_arms, no_match_label)
+                self.emit(f"{string_label}:\n")
+                self.emit_string_dispatch(string_arms, no_match_label)
+
+            # Arms shadowed by an earlier equal case are never reached
+            reachable = set(string_arms.values()) | set(number_arms.values())
+            for case, arm_label in zip(cases, arm_labels):
+                if arm_label not in reachable:
+                    continue
+                self.emit(f"{arm_label}:\n")
                 self.codegen(case.children[0])
-                self.generated_text_asm += f"jmp {end_label}\n"
-                
-                self.generated_text_asm += f"{next_case_label}:\n"
-            
-            # Clean up stack if no match
-            self.generated_text_asm += f"add esp, 4\n"
-            self.generated_text_asm += f"{end_label}:\n"
+                self.emit(f"jmp {end_label}\n")
+
+            self.emit(f"{no_match_label}:\n{end_label}:\n")
         elif node.type == 'BinaryOp':
-            self.codegen(node.children[0])
-            self.generated_text_asm += "push eax\n"
-            self.codegen(node.children[1])
-            self.generated_text_asm += "mov ebx, eax\npop eax\n"
-            
-            if node.value == 'PLUS':
-                self.generated_text_asm += "add eax, ebx\n"
-            elif node.value == 'MINUS':
-                self.generated_text_asm += "sub eax, ebx\n"
-            elif node.value == 'MULTIPLY':
-                self.generated_text_asm += "imul eax, ebx\n"
-            elif node.value == 'DIVIDE':
-                self.generated_text_asm += "cdq\nidiv ebx\n"
-            elif node.value == 'EQUAL':
-                self.generated_text_asm += "cmp eax, ebx\nsete al\nmovzx eax, al\n"
-            elif node.value == 'NOT_EQUAL':
-                self.generated_text_asm += "cmp eax, ebx\nsetne al\nmovzx eax, al\n"
-            elif node.value == 'GREATER':
-                self.generated_text_asm += "cmp eax, ebx\nsetg al\nmovzx eax, al\n"
-            elif node.value == 'GREATER_EQUAL':
-                self.generated_text_asm += "cmp eax, ebx\nsetge al\nmovzx eax, al\n"
-            elif node.value == 'LESS':
-                self.generated_text_asm += "cmp eax, ebx\nsetl al\nmovzx eax, al\n"
-            elif node.value == 'LESS_EQUAL':
-                self.generated_text_asm += "cmp eax, ebx\nsetle al\nmovzx eax, al\n"
-            elif node.value == 'AND':
-                and_false_label = self.get_unique_label("and_false")
-                and_done_label = self.get_unique_label("and_done")
-                self.generated_text_asm += f"test eax, eax\njz {and_false_label}\ntest ebx, ebx\njz {and_false_label}\nmov eax, 1\njmp {and_done_label}\n{and_false_label}:\nxor eax, eax\n{and_done_label}:\n"
-            elif node.value == 'OR':
-                or_true_label = self.get_unique_label("or_true")
-                or_done_label = self.get_unique_label("or_done")
-                self.generated_text_asm += f"test eax, eax\njnz {or_true_label}\ntest ebx, ebx\njnz {or_true_label}\nxor eax, eax\njmp {or_done_label}\n{or_true_label}:\nmov eax, 1\n{or_done_label}:\n"
+            left, right = node.children
+            operand = self.operand(right)
+
+            if operand is not None:
+                # Literals, locals and parameters are used in place
+                self.codegen(left)
+                self.emit_binary(node.value, 'eax', operand)
+            elif (self.allocate_registers and not contains_call(right)
+                  and len(self.live_temporaries) < len(TEMPORARY_REGISTERS)):
+                # No call can clobber a scratch register while the right side runs
+                temporary = TEMPORARY_REGISTERS[len(self.live_temporaries)]
+                self.codegen(left)
+                self.emit(f"mov {temporary}, eax\n")
+                self.live_temporaries.append(temporary)
+                self.codegen(right)
+                self.live_temporaries.pop()
+                self.emit_binary(node.value, temporary, 'eax')
+            else:
+                self.codegen(left)
+                self.emit("push eax\n")
+                self.codegen(right)
+                self.emit("mov ebx, eax\npop eax\n")
+                self.emit_binary(node.value, 'eax', 'ebx')
         elif node.type == 'UnaryOp':
             if node.value == 'NOT':
                 self.codegen(node.children[0])
-                self.generated_text_asm += "test eax, eax\nsetz al\nmovzx eax, al\n"
+                self.emit("test eax, eax\nsetz al\nmovzx eax, al\n")
         elif node.type == 'Number':
-            self.generated_text_asm += f"mov eax, {node.value}\n"
+            self.emit(f"mov eax, {node.value}\n")
         elif node.type == 'Variable':
             if node.value in self.variables:
-                offset = self.variables[node.value]
-                self.generated_text_asm += f"mov eax, dword [ebp{offset:+d}]\n"
+                self.emit(f"mov eax, {self.operand(node)}\n")
             else:
                 raise Exception(f"Undefined variable: {node.value}")
         elif node.type == 'StringLiteral':
-            # Create a string in the data section
-            string_label = self.get_unique_label("str")
             # Convert string to bytes, handling escape sequences
-            char_bytes = []
+            char_bytes = bytearray()
             value = node.value.strip('"')  # Remove surrounding quotes if present
             i = 0
             while i < len(value):
                 char = value[i]
                 if char == '\\' and i + 1 < len(value):
                     next_char = value[i + 1]
-                    if next_char == 'n':
-                        char_bytes.append('10')  # newline
-                        i += 2
-                        continue
-                    elif next_char == 't':
-                        char_bytes.append('9')   # tab
-                        i += 2
-                        continue
-                    elif next_char == '\\':
-                        char_bytes.append('92')  # backslash
+                    if next_char in ESCAPES:
+                        char_bytes.append(ESCAPES[next_char])
                         i += 2
                         continue
-                    elif next_char == '"':
-                        char_bytes.append('34')  # quote
-                        i += 2
-                        continue
-                
-                if char == "'":
-                    char_bytes.append('39')
-                elif ord(char) >= 32 and ord(char) <= 126:
-                    char_bytes.append(f"'{char}'")
-                else:
-                    char_bytes.append(str(ord(char)))
+
+                # nasm keeps the low byte of values over 255
+                char_bytes.append(ord(char) & 0xFF)
                 i += 1
             
-            char_bytes.append('0')  # null terminator
-            char_string = ', '.join(char_bytes)
-            
-            self.generated_data_asm += f"{string_label}: db {char_string}\n"
-            self.generated_text_asm += f"mov eax, {string_label}\n"
+            char_bytes.append(0)  # null terminator
+
+            # Identical strings share one label in the data section
+            string_label = self.intern_string(bytes(char_bytes))
+            self.emit(f"mov eax, {string_label}\n")
         elif node.type == 'FunctionCall':
             command_name = node.value
             
-            # Try to load command from commands subfolder
-            command_module = self.load_command(command_name)
+            # Builtins come from the commands subfolder, anything else is a user function
+            command_module = self.commands.get(command_name)
             if command_module and hasattr(command_module, 'compile'):
                 try:
                     # Prepare arguments for command
@@ -282,6 +680,7 @@ class Compiler:
                             def __init__(self, arg_node, compiler_ref):
                                 self.type = arg_node.type
                                 self.value = arg_node.value
+                                self.value_type = compiler_ref.types.type_of(arg_node, compiler_ref.label_scope)
                                 if arg_node.type == 'Variable' and arg_node.value in compiler_ref.variables:
                                     offset = compiler_ref.variables[arg_node.value]
                                     self.asm = f"[ebp{offset:+d}]"
@@ -292,45 +691,61 @@ class Compiler:
                         
                         command_args.append(SimpleArg(arg, self))
                     
-                    result = command_module.compile(command_args)
+                    result = command_module.compile(command_args, self.get_unique_label)
                     if result:
-                        self.generated_data_asm += result.get("data", "")
-                        self.generated_text_asm += result.get("text", "")
-                        if "bss" in result:
-                            self.generated_bss_asm += result.get("bss", "")
+                        data, text = self.intern_command_data(result.get("data", ""), result.get("text", ""))
+                        sections = {"data": data, "text": text, "bss": result.get("bss", "")}
+
+                        # Fragments are joined as-is, so each must end its last line
+                        for section, emit in (("data", self.emit_data), ("text", self.emit), ("bss", self.emit_bss)):
+                            code = sections[section]
+                            if code and not code.endswith("\n"):
+                                code += "\n"
+                            emit(code)
                 except Exception as e:
                     print(f"Warning: Error compiling command '{command_name}': {e}")
             else:
                 # Try to call user-defined function
                 try:
                     # Push arguments in reverse order
-                    for arg in reversed(node.children):
-                        self.codegen(arg)
-                        self.generated_text_asm += "push eax\n"
+                    self.emit_push_args(node.children)
                     
                     # Call function
-                    self.generated_text_asm += f"call {command_name}\n"
+                    self.emit(f"call {command_name}\n")
                     
                     # Clean up stack
                     if node.children:
-                        self.generated_text_asm += f"add esp, {len(node.children) * 4}\n"
+                        self.emit(f"add esp, {len(node.children) * 4}\n")
                 except Exception as e:
                     print(f"Warning: Could not generate call for function '{command_name}': {e}")
         elif node.type == 'ReturnStatement':
-            if node.children:
-                self.codegen(node.children[0])
+            value = node.children[0] if node.children else None
+            if (value is not None and value.type == 'FunctionCall' and value.value in self.call_arity
+                    and value.value not in self.commands
+                    and len(value.children) <= self.call_arity[self.function_name]):
+                # Tail call: reuse this frame's slots and return address
+                self.emit_tail_call(value)
+                return
+            if value is not None:
+                self.codegen(value)
             # eax already contains the return value
-            self.generated_text_asm += "mov esp, ebp\npop ebp\nret\n"
+            self.emit_epilogue()
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print("Usage: python compiler.py <source_file.rx>")
+        print("Usage: python compiler.py <source_file.rx|.rxc> [--no-optimize] [--no-inline] [--no-peephole] [--no-registers] [--no-cache] [--single-object]"
+              " [--build-dir=DIR] [--output=PATH]")
         sys.exit(1)
         
     source_file = sys.argv[1]
     try:
-        compiler = Compiler(source_file)
-        compiler.run()
+        compiler = Compiler(source_file, optimize='--no-optimize' not in sys.argv, peephole='--no-peephole' not in sys.argv,
+                            registers='--no-registers' not in sys.argv, use_cache='--no-cache' not in sys.argv,
+                            separate='--single-object' not in sys.argv, inline='--no-inline' not in sys.argv)
+        # Values of --name=value options, e.g. a per-job build directory
+        options = dict(arg[2:].split('=', 1) for arg in sys.argv[2:] if arg.startswith('--') and '=' in arg)
+        if compiler.run(options.get('build-dir'), options.get('output')) is None:
+            sys.exit(1)
     except Exception as e:
         print(f"Compilation error: {e}")
         sys.exit(1)
\ No newline at end of file
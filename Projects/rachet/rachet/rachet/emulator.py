@@ -0,0 +1,288 @@
+import re
+
+from compiler import DB_LINE, decode_db
+
+# Addresses mirror the booted kernel closely enough for the print heuristic:
+# string pointers land above 1000000 and small numbers below it
+STACK_TOP = 0x90000
+DATA_BASE = 0x200000
+MEMORY_SIZE = 0x300000
+
+# Pushed as main's return address; returning to it stops the emulator
+EXIT_ADDRESS = 0xFFFFFFF0
+
+REGISTERS = ('eax', 'ebx', 'ecx', 'edx', 'esi', 'edi', 'esp', 'ebp')
+BYTE_REGISTERS = {'al': 'eax', 'bl': 'ebx', 'cl': 'ecx', 'dl': 'edx'}
+
+DD_LINE = re.compile(r'^\s*([A-Za-z_.][\w.]*):\s*dd\s+(.*?)\s*$')
+MEMORY_OPERAND = re.compile(r'^(?:dword\s+|byte\s+)?\[\s*([^\]]+?)\s*\]$')
+
+CONDITIONS = {
+    'e': lambda zf, lt, below: zf,
+    'z': lambda zf, lt, below: zf,
+    'ne': lambda zf, lt, below: not zf,
+    'nz': lambda zf, lt, below: not zf,
+    'l': lambda zf, lt, below: lt,
+    'ge': lambda zf, lt, below: not lt,
+    'g': lambda zf, lt, below: not zf and not lt,
+    'le': lambda zf, lt, below: zf or lt,
+    's': lambda zf, lt, below: lt,
+    'ns': lambda zf, lt, below: not lt,
+    'b': lambda zf, lt, below: below,
+    'ae': lambda zf, lt, below: not below,
+    'a': lambda zf, lt, below: not zf and not below,
+    'be': lambda zf, lt, below: zf or below,
+}
+
+def to_signed(value):
+    value &= 0xFFFFFFFF
+    return value - 0x100000000 if value & 0x80000000 else value
+
+class Emulator:
+    """Runs the text section emitted by Compiler.codegen without nasm or QEMU.
+
+    Only the instruction subset the code generator and command modules emit
+    is understood. Calls into the kernel thunks are serviced natively and
+    print_thunk/print_number_thunk output is collected as text, so compiled
+    programs can be checked against the interpreter.
+    """
+
+    def __init__(self, data_asm, text_asm, bss_asm="", max_steps=50_000_000):
+        self.memory = bytearray(MEMORY_SIZE)
+        self.symbols = {}  # Data and bss labels to addresses
+        self.labels = {}   # Text labels to instruction indexes
+        self.registers = dict.fromkeys(REGISTERS, 0)
+        self.flags = (False, False, False)  # (zero, signed less, unsigned below)
+        self.output = []
+        self.max_steps = max_steps
+        self.steps = 0
+        self.memory_accesses = 0  # Memory operands plus stack pushes and pops
+        self.stack_bytes = 0  # Deepest the stack got through pushes and calls
+        self.code = self.load_text(text_asm)
+        self.load_data(data_asm, bss_asm)
+
+    def load_data(self, data_asm, bss_asm):
+        address = DATA_BASE
+        for line in data_asm.splitlines():
+            match = DD_LINE.match(line)
+            if match:
+                # Jump tables: dd entries naming text labels hold instruction indexes
+                self.symbols[match.group(1)] = address
+                for item in match.group(2).split(','):
+                    item = item.strip()
+                    self.write_dword(address, self.labels[item] if item in self.labels else int(item, 0))
+                    address += 4
+                continue
+
+            match = DB_LINE.match(line)
+            if match is None:
+                continue
+            encoded = decode_db(match.group(2))
+            if encoded is None:
+                raise Exception(f"Cannot parse data line: {line}")
+            self.symbols[match.group(1)] = address
+            self.memory[address:address + len(encoded)] = encoded
+            address += len(encoded)
+
+        for line in bss_asm.splitlines():
+            parts = line.split()
+            if len(parts) == 3 and parts[1] == 'resb':
+                self.symbols[parts[0].rstrip(':')] = address
+                address += int(parts[2], 0)
+
+    def load_text(self, text_asm):
+        code = []
+        for line in text_asm.splitlines():
+            line = line.split(';', 1)[0].strip()
+            if not line or line.split()[0] in ('global', 'extern', 'section'):
+                continue
+            if line.endswith(':') and ' ' not in line:
+                self.labels[line[:-1]] = len(code)
+                continue
+            op, _, rest = line.partition(' ')
+            operands = [operand.strip() for operand in rest.split(',')] if rest.strip() else []
+            code.append((op.lower(), operands))
+        return code
+
+    def address_of(self, expression):
+        total = 0
+        for sign, term in re.findall(r'([+-]?)\s*([^+\-\s]+)', expression):
+            scale = 1
+            if '*' in term:
+                term, scale = term.split('*')
+                scale = int(scale)
+            if term in self.registers:
+                value = self.registers[term]
+            elif term in self.symbols:
+                value = self.symbols[term]
+            else:
+                value = int(term, 0)
+            value *= scale
+            total += -value if sign == '-' else value
+        return total & 0xFFFFFFFF
+
+    def read_dword(self, address):
+        return to_signed(int.from_bytes(self.memory[address:address + 4], 'little'))
+
+    def write_dword(self, address, value):
+        self.memory[address:address + 4] = (value & 0xFFFFFFFF).to_bytes(4, 'little')
+
+    def read(self, operand):
+        if operand in self.registers:
+            return self.registers[operand]
+        if operand in BYTE_REGISTERS:
+            return self.registers[BYTE_REGISTERS[operand]] & 0xFF
+        memory = MEMORY_OPERAND.match(operand)
+        if memory:
+            self.memory_accesses += 1
+            address = self.address_of(memory.group(1))
+            if operand.startswith('byte'):
+                return self.memory[address]
+            return self.read_dword(address)
+        if operand.startswith('dword '):
+            operand = operand[6:].strip()
+        if operand in self.symbols:
+            return self.symbols[operand]
+        return to_signed(int(operand, 0))
+
+    def write(self, operand, value):
+        if operand in self.registers:
+            self.registers[operand] = to_signed(value)
+        elif operand in BYTE_REGISTERS:
+            register = BYTE_REGISTERS[operand]
+            self.registers[register] = to_signed((self.registers[register] & ~0xFF) | (value & 0xFF))
+        else:
+            memory = MEMORY_OPERAND.match(operand)
+            if memory is None:
+                raise Exception(f"Cannot write to operand: {operand}")
+            self.memory_accesses += 1
+            address = self.address_of(memory.group(1))
+            if operand.startswith('byte'):
+                self.memory[address] = value & 0xFF
+            else:
+                self.write_dword(address, value)
+
+    def push(self, value):
+        self.memory_accesses += 1
+        self.registers['esp'] -= 4
+        self.stack_bytes = max(self.stack_bytes, STACK_TOP - self.registers['esp'])
+        self.write_dword(self.registers['esp'], value)
+
+    def pop(self):
+        self.memory_accesses += 1
+        value = self.read_dword(self.registers['esp'])
+        self.registers['esp'] += 4
+        return value
+
+    def read_string(self, address):
+        end = self.memory.index(0, address)
+        return self.memory[address:end].decode('latin-1')
+
+    def call_thunk(self, name):
+        """Service a kernel routine, popping its arguments like its ret N does."""
+        if name == 'print_thunk':
+            self.output.append(self.read_string(self.pop() & 0xFFFFFFFF))
+        elif name == 'print_number_thunk':
+            self.output.append(str(self.pop()))
+        elif name in ('pause_thunk', 'input_thunk'):
+            self.pop()
+        elif name == 'string_compare':
+            first = self.read_string(self.pop() & 0xFFFFFFFF)
+            second = self.read_string(self.pop() & 0xFFFFFFFF)
+            self.registers['eax'] = 1 if first == second else 0
+            # The compare loop leaves a character of the second string in bl
+            self.write('bl', 0)
+        elif name == 'shutdown_thunk':
+            return False
+        else:
+            raise Exception(f"Call to unknown label: {name}")
+        return True
+
+    def set_flags(self, left, right):
+        self.flags = (left == right, left < right, (left & 0xFFFFFFFF) < (right & 0xFFFFFFFF))
+
+    def run(self, entry='main'):
+        registers = self.registers
+        code = self.code
+        registers['esp'] = STACK_TOP
+        self.push(EXIT_ADDRESS)
+        pc = self.labels[entry]
+
+        while True:
+            self.steps += 1
+            if self.steps > self.max_steps:
+                raise Exception(f"Step limit of {self.max_steps} exceeded")
+            op, operands = code[pc]
+            pc += 1
+
+            if op == 'mov':
+                self.write(operands[0], self.read(operands[1]))
+            elif op == 'push':
+                self.push(self.read(operands[0]))
+            elif op == 'pop':
+                self.write(operands[0], self.pop())
+            elif op == 'add':
+                result = to_signed(self.read(operands[0]) + self.read(operands[1]))
+                self.write(operands[0], result)
+                self.set_flags(result, 0)
+            elif op == 'sub':
+                result = to_signed(self.read(operands[0]) - self.read(operands[1]))
+                self.write(operands[0], result)
+                self.set_flags(result, 0)
+            elif op == 'imul':
+                self.write(operands[0], to_signed(self.read(operands[0]) * self.read(operands[-1])))
+            elif op == 'cdq':
+                registers['edx'] = -1 if registers['eax'] < 0 else 0
+            elif op == 'idiv':
+                divisor = self.read(operands[0])
+                if divisor == 0:
+                    raise Exception("Division by zero")
+                dividend = registers['eax']
+                quotient = abs(dividend) // abs(divisor)
+                if (dividend < 0) != (divisor < 0):
+                    quotient = -quotient
+                registers['eax'] = to_signed(quotient)
+                registers['edx'] = to_signed(dividend - quotient * divisor)
+            elif op == 'inc':
+                self.write(operands[0], to_signed(self.read(operands[0]) + 1))
+            elif op == 'and':
+                result = to_signed(self.read(operands[0]) & self.read(operands[1]))
+                self.write(operands[0], result)
+                self.set_flags(result, 0)
+            elif op == 'xor':
+                result = to_signed(self.read(operands[0]) ^ self.read(operands[1]))
+                self.write(operands[0], result)
+                self.set_flags(result, 0)
+            elif op == 'cmp':
+                self.set_flags(self.read(operands[0]), self.read(operands[1]))
+            elif op == 'test':
+                self.set_flags(to_signed(self.read(operands[0]) & self.read(operands[1])), 0)
+            elif op.startswith('set'):
+                self.write(operands[0], 1 if CONDITIONS[op[3:]](*self.flags) else 0)
+            elif op == 'movzx':
+                self.write(operands[0], self.read(operands[1]) & 0xFF)
+            elif op == 'jmp':
+                target = operands[0]
+                pc = self.labels[target] if target in self.labels else self.read(target)
+            elif op.startswith('j'):
+                if CONDITIONS[op[1:]](*self.flags):
+                    pc = self.labels[operands[0]]
+            elif op == 'call':
+                target = operands[0]
+                if target in self.labels:
+                    self.push(pc)
+                    pc = self.labels[target]
+                elif not self.call_thunk(target):
+                    break
+            elif op == 'ret':
+                pc = self.pop() & 0xFFFFFFFF
+                if operands:
+                    registers['esp'] += int(operands[0], 0)
+                if pc == EXIT_ADDRESS:
+                    break
+                if pc >= len(code):
+                    raise Exception(f"Returned to invalid address {pc:#x}")
+            else:
+                raise Exception(f"Unsupported instruction: {op} {', '.join(operands)}")
+
+        return "".join(self.output)
@@ -0,0 +1,136 @@
+from parser import Node
+
+# Functions whose returned expression has more nodes than this keep their call
+INLINE_MAX_NODES = 12
+
+# Inlined bodies are themselves inlined into, down to this many levels
+INLINE_MAX_DEPTH = 4
+
+# Arguments that can be copied to every use of their parameter
+ATOMIC_TYPES = ('Number', 'StringLiteral', 'Variable')
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for child in node.children)
+
+def variable_names(node):
+    if node.type == 'Variable':
+        return {node.value}
+    return set().union(*(variable_names(child) for child in node.children))
+
+def called_functions(node):
+    if node.type == 'FunctionCall':
+        names = {node.value}
+    else:
+        names = set()
+    return names.union(*(called_functions(child) for child in node.children))
+
+def contains_call(node):
+    if node.type == 'FunctionCall':
+        return True
+    return any(contains_call(child) for child in node.children)
+
+def copy_node(node):
+    """Deep copy, since later passes (resolver, optimizer) treat nodes as owned by one site"""
+    return Node(node.type, node.value, [copy_node(child) for child in node.children])
+
+class Inliner:
+    """AST pass that replaces calls to small helpers with the expression they return.
+
+    A function is inlined when its whole body is `return <expression>`,
+    the expression has at most INLINE_MAX_NODES nodes and reads only its
+    parameters, and it cannot reach itself through calls. A call site is
+    only expanded when the result is used and every argument either is a
+    literal, a variable its parameter reads, or is free of calls and read
+    exactly once, so no argument that can fail or has side effects is
+    evaluated a different number of times than before. The
+    declarations are kept for call sites that were not expanded.
+    """
+
+    def __init__(self):
+        self.inlined = 0
+        self.candidates = {}  # Function name -> (parameter names, returned expression)
+
+    def inline(self, ast):
+        functions = {child.value: child for child in ast.children if child.type == 'FunctionDeclaration'}
+        calls = {name: called_functions(func_node.children[0]) for name, func_node in functions.items()}
+
+        self.candidates = {}
+        for name, func_node in functions.items():
+            body = func_node.children[0].children
+            if name == 'main' or len(body) != 1 or body[0].type != 'ReturnStatement' or not body[0].children:
+                continue
+            params = [param.value for param in func_node.children[1:]]
+            expression = body[0].children[0]
+            if (count_nodes(expression) <= INLINE_MAX_NODES and variable_names(expression) <= set(params)
+                    and len(set(params)) == len(params) and not self.reaches(name, name, calls, set())):
+                self.candidates[name] = (params, expression)
+
+        children = []
+        for child in ast.children:
+            if child.type == 'FunctionDeclaration':
+                body = Node('Block', children=[self.inline_statement(statement) for statement in child.children[0].children])
+                child = Node('FunctionDeclaration', child.value, [body] + list(child.children[1:]))
+            children.append(child)
+        return Node('Program', children=children)
+
+    def reaches(self, name, target, calls, seen):
+        """Whether a call from name can lead back to target"""
+        for callee in calls.get(name, ()):
+            if callee == target:
+                return True
+            if callee not in seen:
+                seen.add(callee)
+                if self.reaches(callee, target, calls, seen):
+                    return True
+        return False
+
+    def inline_statement(self, node):
+        if node.type == 'FunctionCall':
+            # The result is discarded, so the call stays a statement
+            return Node('FunctionCall', node.value, [self.inline_expression(arg) for arg in node.children])
+        elif node.type in ('Block', 'IfStatement', 'MatchCase'):
+            return Node(node.type, node.value, [self.inline_statement(child) for child in node.children])
+        elif node.type == 'MatchStatement':
+            subject, *cases = node.children
+            return Node('MatchStatement', children=[self.inline_expression(subject)] + [self.inline_statement(case) for case in cases])
+        elif node.type in ('VariableDeclaration', 'ReturnStatement'):
+            return Node(node.type, node.value, [self.inline_expression(child) for child in node.children])
+        return self.inline_expression(node)
+
+    def inline_expression(self, node, depth=0):
+        children = [self.inline_expression(child, depth) for child in node.children]
+        if node.type == 'FunctionCall' and node.value in self.candidates and depth < INLINE_MAX_DEPTH:
+            expanded = self.expand(node.value, children)
+            if expanded is not None:
+                self.inlined += 1
+                return self.inline_expression(expanded, depth + 1)
+        if not children:
+            return node
+        return Node(node.type, node.value, children)
+
+    def expand(self, name, args):
+        """The callee's expression with args substituted, or None if the call must stay"""
+        params, expression = self.candidates[name]
+        if len(args) != len(params):
+            return None
+
+        uses = dict.fromkeys(params, 0)
+        self.count_uses(expression, uses)
+        for param, arg in zip(params, args):
+            if arg.type not in ATOMIC_TYPES and (contains_call(arg) or uses[param] != 1):
+                return None
+            # Reading a variable can fail ("Undefined variable"), so it is not dropped
+            if arg.type == 'Variable' and uses[param] == 0:
+                return None
+        return self.substitute(expression, dict(zip(params, args)))
+
+    def count_uses(self, node, uses):
+        if node.type == 'Variable':
+            uses[node.value] += 1
+        for child in node.children:
+            self.count_uses(child, uses)
+
+    def substitute(self, node, bindings):
+        if node.type == 'Variable':
+            return copy_node(bindings[node.value])
+        return Node(node.type, node.value, [self.substitute(child, bindings) for child in node.children])
@@ -6,37 +6,101 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from lexer import Lexer
 from parser import Parser, Node
+from closures import ClosureCompiler
+from bytecode import BytecodeCompiler, VirtualMachine, load_bytecode, source_digest
+from resolver import resolve_program, UNSET
+from optimizer import Optimizer
+from inliner import Inliner
+from archive import open_source, SOURCE_EXTENSIONS
+from registry import shared_registry
+
+ENGINES = ('tree', 'closure', 'vm')
+
+# Returned by a ReturnStatement in place of a value; the value itself is
+# parked in Interpreter.return_value so no tuple is built per return
+RETURN = object()
 
 class Interpreter:
-    def __init__(self, source_file):
-        # Check if file has .rx extension
-        if not source_file.endswith('.rx'):
-            raise Exception(f"Error: Only .rx files are supported. '{source_file}' is not a valid source file.")
+    def __init__(self, source_file, engine='tree', optimize=True, inline=True):
+        # Check if file has .rx extension (or is a compressed .rxc)
+        if not source_file.endswith(SOURCE_EXTENSIONS):
+            raise Exception(f"Error: Only .rx and .rxc files are supported. '{source_file}' is not a valid source file.")
+        
+        if engine not in ENGINES:
+            raise Exception(f"Error: Unknown engine '{engine}'. Choose one of: {', '.join(ENGINES)}")
         
         self.source_file = source_file
+        self.engine = engine  # 'tree' is the reference implementation
+        self.optimize = optimize  # Run the constant folding pass before executing
+        self.inline = inline  # Expand calls to small helpers before executing
         self.variables = {}  # Global variable scope
         self.functions = {}  # User-defined functions
-        self.call_stack = []  # For function call contexts
+        self.frame_layouts = {}  # Slot layout per user-defined function
+        self.call_stack = []  # Frames (slot lists) for function call contexts
+        self.return_value = None  # Value of the return statement being unwound
+        self.tail_call = None  # (function name, args) of a `return f(...)` being unwound
+        self.match_tables = {}  # MatchStatement node -> {case value: action}
+        self.builtins = self.load_builtins()  # Command name -> builtin_<name> method
         
+    def load_builtins(self):
+        """Map every registered command to its builtin_<name> implementation"""
+        builtins = {}
+        for command_name in shared_registry().names():
+            method = getattr(self, f"builtin_{command_name}", None)
+            if method is None:
+                def method(args, command_name=command_name):
+                    raise Exception(f"Command '{command_name}' is not supported by the interpreter")
+            builtins[command_name] = method
+        return builtins
+
     def run(self):
         try:
-            with open(self.source_file, 'r') as f:
+            with open_source(self.source_file) as f:
                 source_code = f.read()
         except FileNotFoundError:
             print(f"Error: Source file '{self.source_file}' not found.")
             return
 
+        if self.engine == 'vm':
+            program = self.load_program(source_code)
+            VirtualMachine(program, self).run('main')
+            return
+
+        ast = self.parse_source(source_code)
+
+        # Execute the AST
+        if self.engine == 'closure':
+            program = ClosureCompiler(self).compile_program(ast)
+            program()
+        else:
+            self.execute(ast)
+
+    def load_program(self, source_code):
+        """Get bytecode for the vm engine, reusing a fresh .rxb cache if gears wrote one"""
+        cache_file = os.path.splitext(self.source_file)[0] + '.rxb'
+        program = load_bytecode(cache_file, source_digest(source_code, self.optimize, self.inline))
+        if program is None:
+            program = BytecodeCompiler().compile_program(self.parse_source(source_code))
+        return program
+
+    def parse_source(self, source_code):
         lexer = Lexer(source_code)
-        tokens = lexer.tokenize()
+        tokens = lexer.iter_tokens()
 
         parser = Parser(tokens)
         ast = parser.parse()
 
-        # Execute the AST
-        self.execute(ast)
+        if self.inline:
+            ast = Inliner().inline(ast)
+        if self.optimize:
+            ast = Optimizer().optimize(ast)
+        return ast
 
     def execute(self, node):
         if node.type == 'Program':
+            # Give every local and parameter a numeric frame slot
+            self.frame_layouts = resolve_program(node)
+            
             # First pass: collect all function definitions
             for child in node.children:
                 if child.type == 'FunctionDeclaration':
@@ -56,7 +120,7 @@ class Interpreter:
             for statement in node.children:
                 result = self.execute(statement)
                 # Check if we hit a return statement
-                if isinstance(result, tuple) and result[0] == 'RETURN':
+                if result is RETURN:
                     return result
             return result
             
@@ -66,7 +130,7 @@ class Interpreter:
             
             # Store in current scope (top of call stack or global)
             if self.call_stack:
-                self.call_stack[-1]['locals'][var_name] = value
+                self.call_stack[-1][node.slot] = value
             else:
                 self.variables[var_name] = value
             return value
@@ -82,11 +146,18 @@ class Interpreter:
         elif node.type == 'MatchStatement':
             var_value = self.execute(node.children[0])
             
-            # Compare against each case
-            for case in node.children[1:]:
-                if case.type == 'MatchCase':
-                    if str(var_value) == str(case.value):
-                        return self.execute(case.children[0])
+            # Cases are looked up in a dict built on the first run
+            table = self.match_tables.get(node)
+            if table is None:
+                table = {}
+                for case in node.children[1:]:
+                    if case.type == 'MatchCase':
+                        table.setdefault(str(case.value), case.children[0])  # First arm wins
+                self.match_tables[node] = table
+
+            action = table.get(str(var_value))
+            if action is not None:
+                return self.execute(action)
             return None
             
         elif node.type == 'BinaryOp':
@@ -140,9 +211,11 @@ class Interpreter:
         elif node.type == 'Variable':
             var_name = node.value
             
-            # Check current scope first
-            if self.call_stack and var_name in self.call_stack[-1]['locals']:
-                return self.call_stack[-1]['locals'][var_name]
+            # Check current frame first
+            if self.call_stack and node.slot is not None:
+                value = self.call_stack[-1][node.slot]
+                if value is not UNSET:
+                    return value
             
             # Check global scope
             if var_name in self.variables:
@@ -155,14 +228,9 @@ class Interpreter:
             args = [self.execute(arg) for arg in node.children]
             
             # Check for built-in functions
-            if func_name == 'print':
-                return self.builtin_print(args)
-            elif func_name == 'input':
-                return self.builtin_input(args)
-            elif func_name == 'pause':
-                return self.builtin_pause(args)
-            elif func_name == 'os':
-                return self.builtin_os(args)
+            builtin = self.builtins.get(func_name)
+            if builtin is not None:
+                return builtin(args)
             
             # Check for user-defined functions
             if func_name in self.functions:
@@ -171,37 +239,45 @@ class Interpreter:
             raise Exception(f"Undefined function: {func_name}")
             
         elif node.type == 'ReturnStatement':
-            value = self.execute(node.children[0]) if node.children else None
-            return ('RETURN', value)
+            value = node.children[0] if node.children else None
+            if (value is not None and value.type == 'FunctionCall' and value.value in self.functions
+                    and value.value not in self.builtins):
+                # Tail call: execute_function runs the callee in place of this frame
+                self.tail_call = (value.value, [self.execute(arg) for arg in value.children])
+                return RETURN
+            self.return_value = self.execute(value) if value is not None else None
+            return RETURN
             
         return None
 
     def execute_function(self, func_name, args):
-        func_node = self.functions[func_name]
-        
-        # Get parameter names (skip the first child which is the body)
-        params = func_node.children[1:] if len(func_node.children) > 1 else []
-        
-        # Create new scope
-        local_scope = {}
-        
-        # Bind arguments to parameters
-        for i, param in enumerate(params):
-            if i < len(args):
-                local_scope[param.value] = args[i]
-        
-        # Push scope onto call stack
-        self.call_stack.append({'locals': local_scope})
-        
-        # Execute function body
-        result = self.execute(func_node.children[0])
-        
-        # Pop scope
-        self.call_stack.pop()
-        
+        while True:
+            func_node = self.functions[func_name]
+
+            # Create a fixed-size frame with the arguments bound to parameter slots
+            frame = self.frame_layouts[func_name].new_frame(args)
+
+            # Push frame onto call stack
+            self.call_stack.append(frame)
+
+            # Execute function body
+            result = self.execute(func_node.children[0])
+
+            # Pop frame
+            self.call_stack.pop()
+
+            # A `return f(...)` loops here instead of recursing, so tail
+            # recursion runs in constant Python stack
+            if self.tail_call is None:
+                break
+            func_name, args = self.tail_call
+            self.tail_call = None
+
         # Handle return value
-        if isinstance(result, tuple) and result[0] == 'RETURN':
-            return result[1]
+        if result is RETURN:
+            value = self.return_value
+            self.return_value = None
+            return value
         return None
 
     def builtin_print(self, args):
@@ -235,12 +311,18 @@ class Interpreter:
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print("Usage: python interpreter.py <source_file.rx>")
+        print("Usage: python interpreter.py <source_file.rx|.rxc> [--engine tree|closure|vm] [--no-optimize] [--no-inline]")
         sys.exit(1)
         
     source_file = sys.argv[1]
+    engine = 'tree'
+    if '--engine' in sys.argv:
+        engine_index = sys.argv.index('--engine') + 1
+        if engine_index < len(sys.argv):
+            engine = sys.argv[engine_index]
     try:
-        interpreter = Interpreter(source_file)
+        interpreter = Interpreter(source_file, engine, optimize='--no-optimize' not in sys.argv,
+                                  inline='--no-inline' not in sys.argv)
         interpreter.run()
     except Exception as e:
         print(f"Interpretation error: {e}")
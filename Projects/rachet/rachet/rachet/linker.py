@@ -1,67 +1,235 @@
 import subprocess
 import os
+import re
+import shutil
+import tempfile
 
-def link(generated_data, generated_text, output_type, generated_bss=""):
-    NASM_COMMAND = "nasm"
-    LD_COMMAND = "ld"
-    GRUB_COMMAND = "grub-mkrescue"
+import buildcache
 
-    # Read the kernel from the separate file
-    kernel_file = 'runtimes/kernel.asm'
-    if not os.path.exists(kernel_file):
-        raise FileNotFoundError(f"Kernel file '{kernel_file}' not found. Please ensure kernel.asm exists.")
+NASM_COMMAND = "nasm"
+LD_COMMAND = "ld"
+GRUB_COMMAND = "grub-mkrescue"
+
+KERNEL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runtimes', 'kernel.asm')
+
+# Per-function objects are assembled here, inside the build directory
+OBJECTS_DIR = 'objects'
+
+SYMBOL_DEFINITION = re.compile(r'^\s*([A-Za-z_][\w$#@~?]*)(?::|\s+(?:db|dw|dd|resb|resw|resd)\b)')
+SYMBOL_REFERENCE = re.compile(r'(?<![\w.$#@~?])[A-Za-z_][\w$#@~?]*')
+
+def fragments(section):
+    return [section] if isinstance(section, str) else section
+
+def defined_symbols(asm):
+    """Non-local labels and data names declared in asm"""
+    return {match.group(1) for match in map(SYMBOL_DEFINITION.match, asm.splitlines()) if match}
+
+def referenced_symbols(asm):
+    names = set()
+    for line in asm.splitlines():
+        line = line.split(';', 1)[0]
+        if line.split()[:1] in (['global'], ['extern'], ['section']):
+            continue
+        names.update(SYMBOL_REFERENCE.findall(line))
+    return names
+
+def split_functions(text):
+    """Split the text section into (name, asm) units, one per global function"""
+    units = []
+    name, lines = None, []
+    for line in text.splitlines(keepends=True):
+        words = line.split()
+        if words[:1] == ['global']:
+            if lines:
+                units.append((name or 'prelude', "".join(lines)))
+            name, lines = words[1], []
+            continue
+        lines.append(line)
+    if lines:
+        units.append((name or 'prelude', "".join(lines)))
+    return units
+
+def unit_source(body, defined, external):
+    """Wrap body with the global/extern directives it needs to assemble on its own"""
+    header = ["[bits 32]\n"]
+    header.extend(f"extern {name}\n" for name in sorted((referenced_symbols(body) & external) - defined))
+    header.extend(f"global {name}\n" for name in sorted(defined))
+    return "".join(header) + body
+
+def assemble(source, name, objects_dir, use_cache):
+    """Assemble source to <objects_dir>/<name>.o, reusing the cached object for identical source"""
+    object_path = os.path.join(objects_dir, f"{name}.o")
+    digest = buildcache.text_digest(source)
+    cached = buildcache.lookup('object', digest, 'unit.o') if use_cache else None
+    if cached:
+        shutil.copyfile(cached, object_path)
+        return object_path, True
+
+    asm_path = os.path.join(objects_dir, f"{name}.asm")
+    with open(asm_path, 'w') as f:
+        f.write(source)
+    subprocess.run([NASM_COMMAND, asm_path, '-f', 'elf32', '-o', object_path], check=True)
+    if use_cache:
+        buildcache.store('object', digest, object_path, 'unit.o')
+    return object_path, False
+
+def object_sources(kernel_asm, data_fragments, bss_fragments, text_fragments):
+    """Return (name, source) for the kernel, the data/bss unit and every function"""
+    functions = split_functions("".join(text_fragments))
+    data = ""
+    if any(fragment.strip() for fragment in data_fragments):
+        data += "section .data\n" + "".join(data_fragments) + "\n"
+    if any(fragment.strip() for fragment in bss_fragments):
+        data += "section .bss\n" + "".join(bss_fragments) + "\n"
+
+    kernel_symbols = {line.split()[1] for line in kernel_asm.splitlines() if line.split()[:1] == ['global']}
+    bodies = [('data', data)] + [(name, "section .text\n" + asm) for name, asm in functions]
+    definitions = [defined_symbols(body) for _, body in bodies]
+    everything = kernel_symbols.union(*definitions)
+
+    # The kernel calls main, everything else is resolved between the units
+    sources = [('kernel', f"extern main\n{kernel_asm}\n")]
+    for (name, body), defined in zip(bodies, definitions):
+        if body.strip():
+            sources.append((f"{len(sources):03d}_{name}", unit_source(body, defined, everything)))
+    return sources
+
+def link(generated_data, generated_text, output_type, generated_bss="", use_cache=True, separate=True,
+         build_dir=None, output_path=None, errors=None):
+    """Assemble and link the generated sections, returning the image path or None on failure.
+
+    Intermediate files go to build_dir, a fresh temporary directory unless
+    one is given, so concurrent builds never share them. The image is
+    written to output_path, or as main.<type> into output_path when it is a
+    directory, or into the current directory by default. Failure messages
+    are printed and, when errors is a list, appended to it.
+    """
+    if not os.path.exists(KERNEL_FILE):
+        raise FileNotFoundError(f"Kernel file '{KERNEL_FILE}' not found. Please ensure kernel.asm exists.")
     
-    with open(kernel_file, 'r') as f:
+    with open(KERNEL_FILE, 'r') as f:
         kernel_asm = f.read()
+
+    output_name = f"main.{output_type}"
+    if output_path is None:
+        output_path = output_name
+    elif os.path.isdir(output_path):
+        output_path = os.path.join(output_path, output_name)
+
+    owns_build_dir = build_dir is None
+    if owns_build_dir:
+        build_dir = tempfile.mkdtemp(prefix="rachet-build-")
+    else:
+        os.makedirs(build_dir, exist_ok=True)
+    temp_asm = os.path.join(build_dir, 'temp.asm')
+    temp_object = os.path.join(build_dir, 'temp.o')
+    objects_dir = os.path.join(build_dir, OBJECTS_DIR)
+    kernel_elf = os.path.join(build_dir, 'kernel.elf')
+    iso_dir = os.path.join(build_dir, 'iso')
     
-    # Combine kernel with generated code
-    final_asm = f"{kernel_asm}\n\n"
-    
-    # Add data section if there's any generated data
-    if generated_data.strip():
-        final_asm += f"section .data\n{generated_data}\n"
-    
-    # Add BSS section if there's any generated BSS
-    if generated_bss.strip():
-        final_asm += f"section .bss\n{generated_bss}\n"
-    
-    # Always add text section
-    final_asm += f"section .text\n{generated_text}"
-    
-    with open('temp.asm', 'w') as f:
-        f.write(final_asm)
-    
+    # Sections may be strings or lists of fragments; either way they are
+    # streamed to disk instead of being concatenated in memory
+    data_fragments = fragments(generated_data)
+    bss_fragments = fragments(generated_bss)
+    text_fragments = fragments(generated_text)
+
     try:
-        subprocess.run([NASM_COMMAND, 'temp.asm', '-f', 'elf32', '-o', 'temp.o'], check=True)
-        subprocess.run([LD_COMMAND, '-m', 'elf_i386', '-Ttext', '0x100000', 'temp.o', '-o', 'kernel.elf'], check=True)
+        if separate:
+            sources = object_sources(kernel_asm, data_fragments, bss_fragments, text_fragments)
+            build_digest = buildcache.text_digest("\0".join(source for _, source in sources))
+        else:
+            with open(temp_asm, 'w') as f:
+                f.write(f"{kernel_asm}\n\n")
+
+                # Add data section if there's any generated data
+                if any(fragment.strip() for fragment in data_fragments):
+                    f.write("section .data\n")
+                    f.writelines(data_fragments)
+                    f.write("\n")
+
+                # Add BSS section if there's any generated BSS
+                if any(fragment.strip() for fragment in bss_fragments):
+                    f.write("section .bss\n")
+                    f.writelines(bss_fragments)
+                    f.write("\n")
+
+                # Always add text section
+                f.write("section .text\n")
+                f.writelines(text_fragments)
+            build_digest = buildcache.file_digest(temp_asm)
+
+        # Identical assembly reuses the cached image
+        cached_output = buildcache.lookup('asm', build_digest, output_name) if use_cache else None
+        if cached_output:
+            shutil.copyfile(cached_output, output_path)
+            print(f"Reused cached {output_name} (assembly unchanged)")
+            return output_path
+
+        if separate:
+            # One object per function; unchanged ones come from the cache
+            os.makedirs(objects_dir, exist_ok=True)
+            objects = []
+            reused = 0
+            for name, source in sources:
+                object_path, from_cache = assemble(source, name, objects_dir, use_cache)
+                objects.append(object_path)
+                reused += from_cache
+            print(f"Assembled {len(objects) - reused} object(s), reused {reused} unchanged")
+        else:
+            cached_object = buildcache.lookup('asm', build_digest, 'temp.o') if use_cache else None
+            if cached_object:
+                shutil.copyfile(cached_object, temp_object)
+                print("Reused cached temp.o (assembly unchanged)")
+            else:
+                subprocess.run([NASM_COMMAND, temp_asm, '-f', 'elf32', '-o', temp_object], check=True)
+                if use_cache:
+                    buildcache.store('asm', build_digest, temp_object)
+            objects = [temp_object]
+
+        # The kernel object comes first so the multiboot header leads .text
+        subprocess.run([LD_COMMAND, '-m', 'elf_i386', '-Ttext', '0x100000'] + objects + ['-o', kernel_elf], check=True)
 
         if output_type == 'iso':
-            os.makedirs('iso/boot/grub', exist_ok=True)
-            with open('iso/boot/grub/grub.cfg', 'w') as f:
+            os.makedirs(os.path.join(iso_dir, 'boot', 'grub'), exist_ok=True)
+            with open(os.path.join(iso_dir, 'boot', 'grub', 'grub.cfg'), 'w') as f:
                 f.write("set timeout=0\n")
                 f.write("set default=0\n") 
                 f.write("menuentry \"myLang OS\" {\n")
                 f.write("  multiboot /boot/kernel.elf\n")
                 f.write("}\n")
             
-            os.rename('kernel.elf', 'iso/boot/kernel.elf')
-            subprocess.run([GRUB_COMMAND, '--output=main.iso', 'iso'], check=True)
-            print("Successfully created main.iso")
+            os.rename(kernel_elf, os.path.join(iso_dir, 'boot', 'kernel.elf'))
+            subprocess.run([GRUB_COMMAND, f'--output={output_path}', iso_dir], check=True)
+            print(f"Successfully created {output_path}")
         
         elif output_type == 'bin':
-            os.rename('kernel.elf', 'main.bin')
-            print("Successfully created main.bin")
+            shutil.move(kernel_elf, output_path)
+            print(f"Successfully created {output_path}")
 
-        # Clean up temporary files
-        if os.path.exists('temp.asm'):
-            os.remove('temp.asm')
-        if os.path.exists('temp.o'):
-            os.remove('temp.o')
+        if use_cache and os.path.exists(output_path):
+            buildcache.store('asm', build_digest, output_path, output_name)
+        return output_path
             
     except subprocess.CalledProcessError as e:
-        print(f"Error during compilation: {e}")
+        message = f"Error during compilation: {e}"
     except Exception as e:
-        print(f"Unexpected error: {e}")
+        message = f"Unexpected error: {e}"
+    finally:
+        # Clean up temporary files
+        if owns_build_dir:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        else:
+            for path in (temp_asm, temp_object, kernel_elf):
+                if os.path.exists(path):
+                    os.remove(path)
+            shutil.rmtree(objects_dir, ignore_errors=True)
+            shutil.rmtree(iso_dir, ignore_errors=True)
+
+    print(message)
+    if errors is not None:
+        errors.append(message)
+    return None
 
 if __name__ == '__main__':
     print("This module provides the link() function for the compiler.")
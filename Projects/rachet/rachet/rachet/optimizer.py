@@ -0,0 +1,168 @@
+from parser import Node
+
+# Folded results must fit the 32-bit registers the compiler uses, so both
+# backends agree on the value
+INT32_MIN = -2 ** 31
+INT32_MAX = 2 ** 31 - 1
+
+FOLDABLE_OPS = {
+    'PLUS': lambda a, b: a + b,
+    'MINUS': lambda a, b: a - b,
+    'MULTIPLY': lambda a, b: a * b,
+    'EQUAL': lambda a, b: 1 if a == b else 0,
+    'NOT_EQUAL': lambda a, b: 1 if a != b else 0,
+    'GREATER': lambda a, b: 1 if a > b else 0,
+    'GREATER_EQUAL': lambda a, b: 1 if a >= b else 0,
+    'LESS': lambda a, b: 1 if a < b else 0,
+    'LESS_EQUAL': lambda a, b: 1 if a <= b else 0,
+    'AND': lambda a, b: 1 if a and b else 0,
+    'OR': lambda a, b: 1 if a or b else 0,
+}
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for child in node.children)
+
+def contains_declaration(node):
+    if node.type == 'VariableDeclaration':
+        return True
+    return any(contains_declaration(child) for child in node.children)
+
+class Optimizer:
+    """AST pass run between Parser.parse and the interpreter/compiler backends.
+
+    Folds BinaryOp/UnaryOp nodes whose operands are number literals,
+    replaces IfStatements with a literal condition by the branch that runs
+    and MatchStatements on a literal subject by the arm that matches.
+    Only rewrites that both backends would evaluate identically are made:
+    integer division is folded for non-negative operands only (Python
+    floors, idiv truncates) and branches that declare variables are kept
+    so the compiler still allocates their stack slots.
+    """
+
+    def __init__(self):
+        self.folded = 0
+        self.pruned = 0
+        self.nodes_removed = 0
+
+    def optimize(self, ast):
+        before = count_nodes(ast)
+        children = []
+        for child in ast.children:
+            if child.type == 'FunctionDeclaration':
+                body = Node('Block', children=self.optimize_statements(child.children[0].children))
+                child = Node('FunctionDeclaration', child.value, [body] + list(child.children[1:]))
+            children.append(child)
+        result = Node('Program', children=children)
+        self.nodes_removed = before - count_nodes(result)
+        return result
+
+    def optimize_statements(self, statements):
+        result = []
+        for statement in statements:
+            result.extend(self.optimize_statement(statement))
+        return result
+
+    def optimize_statement(self, node):
+        """Return the list of statements that replace node"""
+        if node.type == 'Block':
+            return [Node('Block', children=self.optimize_statements(node.children))]
+
+        elif node.type == 'VariableDeclaration':
+            children = [self.optimize_expression(node.children[0])] + list(node.children[1:])
+            return [Node('VariableDeclaration', node.value, children)]
+
+        elif node.type == 'IfStatement':
+            condition = self.optimize_expression(node.children[0])
+            branches = list(node.children[1:])
+
+            if condition.type == 'Number':
+                taken = branches[0] if condition.value else (branches[1] if len(branches) > 1 else None)
+                dropped = [branch for branch in branches if branch is not taken]
+                if not any(contains_declaration(branch) for branch in dropped):
+                    self.pruned += 1
+                    if taken is None:
+                        return []
+                    if taken.type == 'Block':
+                        return self.optimize_statements(taken.children)
+                    return self.optimize_statement(taken)
+
+            children = [condition]
+            for branch in branches:
+                optimized = self.optimize_statement(branch)
+                if len(optimized) == 1 and optimized[0].type in ('Block', 'IfStatement'):
+                    children.append(optimized[0])
+                else:
+                    # A pruned else-if collapses into a plain else block
+                    children.append(Node('Block', children=optimized))
+            return [Node('IfStatement', children=children)]
+
+        elif node.type == 'MatchStatement':
+            subject = self.optimize_expression(node.children[0])
+            cases = [
+                Node('MatchCase', case.value, [self.optimize_case_action(case.children[0])])
+                for case in node.children[1:]
+            ]
+
+            # String subjects with escapes are encoded differently by each
+            # backend, so only plain literals are decided statically
+            literal = None
+            if subject.type == 'Number':
+                literal = str(subject.value)
+            elif subject.type == 'StringLiteral' and '\\' not in subject.value:
+                literal = subject.value.strip('"')
+
+            if literal is not None:
+                self.pruned += 1
+                for case in cases:
+                    if str(case.value) == literal:
+                        return [case.children[0]]
+                return []
+
+            return [Node('MatchStatement', children=[subject] + cases)]
+
+        elif node.type == 'ReturnStatement':
+            return [Node('ReturnStatement', children=[self.optimize_expression(child) for child in node.children])]
+
+        return [self.optimize_expression(node)]
+
+    def optimize_case_action(self, node):
+        if node.type == 'ReturnStatement':
+            return self.optimize_statement(node)[0]
+        return self.optimize_expression(node)
+
+    def optimize_expression(self, node):
+        if node.type == 'BinaryOp':
+            left = self.optimize_expression(node.children[0])
+            right = self.optimize_expression(node.children[1])
+            if left.type == 'Number' and right.type == 'Number':
+                value = self.fold_binary(node.value, left.value, right.value)
+                if value is not None:
+                    self.folded += 1
+                    return Node('Number', value)
+            return Node('BinaryOp', node.value, [left, right])
+
+        elif node.type == 'UnaryOp':
+            operand = self.optimize_expression(node.children[0])
+            if node.value == 'NOT' and operand.type == 'Number':
+                self.folded += 1
+                return Node('Number', 1 if not operand.value else 0)
+            return Node('UnaryOp', node.value, [operand])
+
+        elif node.type == 'FunctionCall':
+            return Node('FunctionCall', node.value, [self.optimize_expression(arg) for arg in node.children])
+
+        return node
+
+    def fold_binary(self, op, left, right):
+        if op == 'DIVIDE':
+            if left < 0 or right <= 0:
+                return None
+            value = left // right
+        elif op in FOLDABLE_OPS:
+            value = FOLDABLE_OPS[op](left, right)
+        else:
+            return None
+
+        if not INT32_MIN <= value <= INT32_MAX:
+            return None
+        return value
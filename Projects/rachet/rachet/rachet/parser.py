@@ -1,8 +1,18 @@
+import sys
+from collections import deque
+
+# Shared by every leaf node so Number/Variable/StringLiteral don't each
+# allocate their own empty list; children are never mutated after parsing
+EMPTY_CHILDREN = ()
+
 class Node:
+    __slots__ = ('type', 'value', 'children', 'slot')
+
     def __init__(self, type, value=None, children=None):
-        self.type = type
+        self.type = sys.intern(type)
         self.value = value
-        self.children = children if children is not None else []
+        self.children = children if children else EMPTY_CHILDREN
+        self.slot = None  # Frame slot, filled in by resolver.resolve_program
 
     def __repr__(self):
         if self.children:
@@ -11,37 +21,58 @@ class Node:
 
 class Parser:
     def __init__(self, tokens):
-        self.tokens = tokens
+        # Accepts a token list or a lazy stream such as Lexer.iter_tokens();
+        # only the tokens currently being looked at are kept in memory
+        self.tokens = iter(tokens)
+        self.lookahead = deque()
         self.position = 0
 
     def parse(self):
-        ast = Node('Program')
-        while self.position < len(self.tokens):
+        children = []
+        while not self.at_end():
             if self.current_token().type == 'USE':
-                ast.children.append(self.parse_use_statement())
+                children.append(self.parse_use_statement())
             elif self.current_token().type == 'FN':
-                ast.children.append(self.parse_function_declaration())
+                children.append(self.parse_function_declaration())
             else:
                 raise Exception(f"Unexpected token: {self.current_token().type}")
-        return ast
+        return Node('Program', children=children)
+
+    def fill_lookahead(self, count):
+        """Pull tokens from the stream until `count` are buffered"""
+        while len(self.lookahead) < count:
+            token = next(self.tokens, None)
+            if token is None:
+                return False
+            self.lookahead.append(token)
+        return True
+
+    def at_end(self):
+        return not self.fill_lookahead(1)
 
     def current_token(self):
-        if self.position >= len(self.tokens):
+        if not self.fill_lookahead(1):
             raise Exception(f"Unexpected end of file at position {self.position}")
-        return self.tokens[self.position]
+        return self.lookahead[0]
 
     def peek_token(self, offset=1):
         """Look ahead at the next token without advancing"""
-        pos = self.position + offset
-        if pos >= len(self.tokens):
+        if not self.fill_lookahead(offset + 1):
             return None
-        return self.tokens[pos]
+        return self.lookahead[offset]
+
+    def next_is(self, token_type):
+        """Check the type of the token after the current one"""
+        token = self.peek_token()
+        return token is not None and token.type == token_type
 
     def advance(self):
+        if self.fill_lookahead(1):
+            self.lookahead.popleft()
         self.position += 1
 
     def expect(self, token_type):
-        if self.position >= len(self.tokens):
+        if self.at_end():
             raise Exception(f"Expected token type '{token_type}', but reached end of file")
         if self.current_token().type == token_type:
             self.advance()
@@ -98,7 +129,7 @@ class Parser:
             return self.parse_return_statement()
         elif self.current_token().type in ['IDENTIFIER', 'INPUT', 'OS', 'PRINT', 'PAUSE']:
             # Check if it's a function call by looking ahead
-            if self.position + 1 < len(self.tokens) and self.tokens[self.position + 1].type == 'LPAREN':
+            if self.next_is('LPAREN'):
                 stmt = self.parse_function_call_statement()
                 return stmt
             else:
@@ -125,10 +156,10 @@ class Parser:
         value = self.parse_expression()
         self.expect('SEMICOLON')
         
-        var_node = Node('VariableDeclaration', name, [value])
+        children = [value]
         if var_type:
-            var_node.children.append(Node('Type', var_type))
-        return var_node
+            children.append(Node('Type', var_type))
+        return Node('VariableDeclaration', name, children)
 
     def parse_if_statement(self):
         self.expect('IF')
@@ -140,7 +171,7 @@ class Parser:
         self.expect('RBRACE')
         
         else_block = None
-        if self.position < len(self.tokens) and self.current_token().type == 'ELSE':
+        if not self.at_end() and self.current_token().type == 'ELSE':
             self.advance()
             if self.current_token().type == 'IF':
                 else_block = self.parse_if_statement()
@@ -172,7 +203,7 @@ class Parser:
             else:
                 # For other actions in match cases
                 if self.current_token().type in ['IDENTIFIER', 'PRINT', 'INPUT', 'OS', 'PAUSE']:
-                    if self.position + 1 < len(self.tokens) and self.tokens[self.position + 1].type == 'LPAREN':
+                    if self.next_is('LPAREN'):
                         action = self.parse_function_call_expression()
                     else:
                         raise Exception(f"Unexpected token in match case: {self.current_token().type}")
@@ -198,7 +229,7 @@ class Parser:
 
     def parse_logical_or(self):
         left = self.parse_logical_and()
-        while self.position < len(self.tokens) and self.current_token().type == 'OR':
+        while not self.at_end() and self.current_token().type == 'OR':
             op = self.current_token().type
             self.advance()
             right = self.parse_logical_and()
@@ -207,7 +238,7 @@ class Parser:
 
     def parse_logical_and(self):
         left = self.parse_equality()
-        while self.position < len(self.tokens) and self.current_token().type == 'AND':
+        while not self.at_end() and self.current_token().type == 'AND':
             op = self.current_token().type
             self.advance()
             right = self.parse_equality()
@@ -216,7 +247,7 @@ class Parser:
 
     def parse_equality(self):
         left = self.parse_comparison()
-        while self.position < len(self.tokens) and self.current_token().type in ['EQUAL', 'NOT_EQUAL']:
+        while not self.at_end() and self.current_token().type in ['EQUAL', 'NOT_EQUAL']:
             op = self.current_token().type
             self.advance()
             right = self.parse_comparison()
@@ -225,7 +256,7 @@ class Parser:
 
     def parse_comparison(self):
         left = self.parse_unary()
-        while self.position < len(self.tokens) and self.current_token().type in ['GREATER', 'GREATER_EQUAL', 'LESS', 'LESS_EQUAL']:
+        while not self.at_end() and self.current_token().type in ['GREATER', 'GREATER_EQUAL', 'LESS', 'LESS_EQUAL']:
             op = self.current_token().type
             self.advance()
             right = self.parse_unary()
@@ -243,7 +274,7 @@ class Parser:
 
     def parse_arithmetic(self):
         left = self.parse_term()
-        while self.position < len(self.tokens) and self.current_token().type in ['PLUS', 'MINUS']:
+        while not self.at_end() and self.current_token().type in ['PLUS', 'MINUS']:
             op = self.current_token().type
             self.advance()
             right = self.parse_term()
@@ -252,7 +283,7 @@ class Parser:
 
     def parse_term(self):
         left = self.parse_primary()
-        while self.position < len(self.tokens) and self.current_token().type in ['MULTIPLY', 'DIVIDE']:
+        while not self.at_end() and self.current_token().type in ['MULTIPLY', 'DIVIDE']:
             op = self.current_token().type
             self.advance()
             right = self.parse_primary()
@@ -270,7 +301,7 @@ class Parser:
             return Node('StringLiteral', value)
         elif self.current_token().type in ['IDENTIFIER', 'INPUT', 'OS', 'PRINT', 'PAUSE']:
             # Check if it's a function call
-            if self.position + 1 < len(self.tokens) and self.tokens[self.position + 1].type == 'LPAREN':
+            if self.next_is('LPAREN'):
                 return self.parse_function_call_expression()
             else:
                 value = self.current_token().value
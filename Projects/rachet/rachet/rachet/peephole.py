@@ -0,0 +1,223 @@
+import re
+
+REGISTERS = {'eax', 'ebx', 'ecx', 'edx', 'esi', 'edi', 'esp', 'ebp', 'al', 'bl', 'ax', 'bx'}
+
+# Instructions whose first operand is eax and second may be any r/m32 or imm32
+FOLDABLE_INTO_EAX = {'add', 'sub', 'imul', 'cmp'}
+
+# Control transfers that end a straight-line run of instructions
+UNCONDITIONAL = {'jmp', 'ret'}
+CONTROL_FLOW = UNCONDITIONAL | {'call', 'je', 'jne', 'jz', 'jnz', 'jl', 'jle', 'jg', 'jge', 'js', 'jns'}
+
+DIRECTIVES = {'global', 'extern', 'section'}
+
+REGISTER_PATTERN = re.compile(r'\b(e?[abcd]x|[abcd]l|e[sd]i|e[sb]p)\b')
+
+class Instruction:
+    """One line of the text section: a label, a directive or an instruction."""
+    __slots__ = ('op', 'operands', 'label')
+
+    def __init__(self, op=None, operands=(), label=None):
+        self.op = op
+        self.operands = operands
+        self.label = label
+
+    @classmethod
+    def parse(cls, line):
+        line = line.split(';', 1)[0].strip()
+        if not line:
+            return None
+        if line.endswith(':') and ' ' not in line:
+            return cls(label=line[:-1])
+        op, _, rest = line.partition(' ')
+        operands = tuple(operand.strip() for operand in rest.split(',')) if rest.strip() else ()
+        return cls(op.lower(), operands)
+
+    def is_instruction(self):
+        return self.label is None and self.op not in DIRECTIVES
+
+    def __str__(self):
+        if self.label is not None:
+            return f"{self.label}:"
+        if self.operands:
+            return f"{self.op} {', '.join(self.operands)}"
+        return self.op
+
+def registers_in(operand):
+    return set(REGISTER_PATTERN.findall(operand))
+
+def is_register(operand):
+    return operand in REGISTERS
+
+def mentions(instruction, *registers):
+    return any(registers_in(operand) & set(registers) for operand in instruction.operands)
+
+class PeepholeOptimizer:
+    """Rewrites the text section emitted by Compiler.codegen before linking.
+
+    Patterns are matched on short windows of instructions and applied until
+    nothing changes. They rely on the codegen convention that ebx only
+    carries the right operand of a BinaryOp, so it is dead once the
+    operation that reads it has run and at every label, jump or call.
+    """
+
+    def __init__(self):
+        self.instructions_before = 0
+        self.instructions_after = 0
+
+    def optimize(self, text_asm):
+        code = [instruction for instruction in map(Instruction.parse, text_asm.splitlines()) if instruction]
+        self.instructions_before = self.count(code)
+
+        changed = True
+        while changed:
+            changed = False
+            for rewrite in (self.remove_dead_code, self.remove_jumps_to_next, self.fold_push_pop,
+                            self.fold_right_operand, self.fold_operand_into_eax, self.push_operand_directly):
+                code, did_change = rewrite(code)
+                changed = changed or did_change
+
+        self.instructions_after = self.count(code)
+        return "".join(f"{instruction}\n" for instruction in code)
+
+    def count(self, code):
+        return sum(1 for instruction in code if instruction.is_instruction())
+
+    def remove_dead_code(self, code):
+        """Drop instructions after a jmp or ret up to the next label."""
+        result = []
+        unreachable = False
+        for instruction in code:
+            if not instruction.is_instruction():
+                unreachable = False
+            elif unreachable:
+                continue
+            elif instruction.op in UNCONDITIONAL:
+                unreachable = True
+            result.append(instruction)
+        return result, len(result) != len(code)
+
+    def remove_jumps_to_next(self, code):
+        """Drop a jmp whose target is one of the labels straight after it."""
+        result = []
+        changed = False
+        for i, instruction in enumerate(code):
+            if instruction.op == 'jmp':
+                following = set()
+                for later in code[i + 1:]:
+                    if later.label is None:
+                        break
+                    following.add(later.label)
+                if instruction.operands[0] in following:
+                    changed = True
+                    continue
+            result.append(instruction)
+        return result, changed
+
+    def fold_push_pop(self, code):
+        """push r1 / pop r2 becomes mov r2, r1, or nothing when r1 is r2."""
+        result = []
+        changed = False
+        i = 0
+        while i < len(code):
+            instruction = code[i]
+            following = code[i + 1] if i + 1 < len(code) else None
+            if (instruction.op == 'push' and following is not None and following.op == 'pop'
+                    and is_register(instruction.operands[0])):
+                source, target = instruction.operands[0], following.operands[0]
+                if source != target:
+                    result.append(Instruction('mov', (target, source)))
+                changed = True
+                i += 2
+                continue
+            result.append(instruction)
+            i += 1
+        return result, changed
+
+    def fold_right_operand(self, code):
+        """push eax / mov eax, x / mov ebx, eax / pop eax becomes mov ebx, x."""
+        result = []
+        changed = False
+        i = 0
+        while i < len(code):
+            window = code[i:i + 4]
+            if (len(window) == 4
+                    and window[0].op == 'push' and window[0].operands == ('eax',)
+                    and window[1].op == 'mov' and window[1].operands[0] == 'eax'
+                    and not registers_in(window[1].operands[1]) & {'eax', 'esp', 'ebx'}
+                    and window[2].op == 'mov' and window[2].operands == ('ebx', 'eax')
+                    and window[3].op == 'pop' and window[3].operands == ('eax',)):
+                result.append(Instruction('mov', ('ebx', window[1].operands[1])))
+                changed = True
+                i += 4
+                continue
+            result.append(code[i])
+            i += 1
+        return result, changed
+
+    def fold_operand_into_eax(self, code):
+        """mov ebx, x / add eax, ebx becomes add eax, x for immediates and memory."""
+        result = []
+        changed = False
+        i = 0
+        while i < len(code):
+            instruction = code[i]
+            following = code[i + 1] if i + 1 < len(code) else None
+            if (instruction.op == 'mov' and instruction.operands[0] == 'ebx'
+                    and not is_register(instruction.operands[1])
+                    and following is not None and following.op in FOLDABLE_INTO_EAX
+                    and following.operands == ('eax', 'ebx')
+                    and self.ebx_dead_after(code, i + 2)):
+                result.append(Instruction(following.op, ('eax', instruction.operands[1])))
+                changed = True
+                i += 2
+                continue
+            result.append(instruction)
+            i += 1
+        return result, changed
+
+    def ebx_dead_after(self, code, start):
+        for instruction in code[start:]:
+            if not instruction.is_instruction() or instruction.op in CONTROL_FLOW:
+                return True
+            if instruction.op == 'mov' and instruction.operands[0] == 'ebx' and 'ebx' not in registers_in(instruction.operands[1]):
+                return True
+            if mentions(instruction, 'ebx', 'bl', 'bx'):
+                return False
+        return True
+
+    def push_operand_directly(self, code):
+        """mov eax, x / push eax / mov eax, y becomes push dword x / mov eax, y."""
+        result = []
+        changed = False
+        i = 0
+        while i < len(code):
+            window = code[i:i + 3]
+            if (len(window) == 3
+                    and window[0].op == 'mov' and window[0].operands[0] == 'eax'
+                    and not registers_in(window[0].operands[1]) & {'eax', 'esp'}
+                    and window[1].op == 'push' and window[1].operands == ('eax',)
+                    and window[2].op == 'mov' and window[2].operands[0] == 'eax'
+                    and not registers_in(window[2].operands[1]) & {'eax', 'esp'}):
+                source = window[0].operands[1]
+                if not is_register(source) and not source.startswith('dword'):
+                    source = f"dword {source}"
+                result.append(Instruction('push', (source,)))
+                result.append(window[2])
+                changed = True
+                i += 3
+                continue
+            result.append(code[i])
+            i += 1
+        return result, changed
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r') as f:
+            text = f.read()
+        optimizer = PeepholeOptimizer()
+        print(optimizer.optimize(text), end='')
+        print(f"; {optimizer.instructions_before} -> {optimizer.instructions_after} instructions", file=sys.stderr)
+    else:
+        print("Usage: python peephole.py <text_section.asm>")
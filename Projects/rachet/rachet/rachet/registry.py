@@ -0,0 +1,49 @@
+import glob
+import importlib.util
+import os
+
+COMMANDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'commands')
+
+class CommandRegistry:
+    """Every commands/cmd_<name>.py module, discovered and imported once.
+
+    The compiler dispatches builtins to a module's compile(args, labels) and
+    the interpreter engines to their builtin_<name> method, both through
+    this registry, so a name is a builtin in every backend or in none.
+    Lookups are a dict access, so calls to user functions never touch the
+    disk. labels(prefix) returns a label unique within the program and
+    numbered deterministically, so the same source compiles to the same
+    assembly every time.
+    """
+
+    def __init__(self, commands_dir=COMMANDS_DIR):
+        self.commands_dir = commands_dir
+        self.modules = {}
+        for command_file in sorted(glob.glob(os.path.join(commands_dir, 'cmd_*.py'))):
+            command_name = os.path.basename(command_file)[len('cmd_'):-len('.py')]
+            try:
+                spec = importlib.util.spec_from_file_location(f"cmd_{command_name}", command_file)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                self.modules[command_name] = module
+            except Exception as e:
+                print(f"Warning: Could not load command '{command_name}': {e}")
+
+    def __contains__(self, command_name):
+        return command_name in self.modules
+
+    def get(self, command_name):
+        """Return the command module for command_name, or None for user functions"""
+        return self.modules.get(command_name)
+
+    def names(self):
+        return list(self.modules)
+
+_shared_registry = None
+
+def shared_registry():
+    """The registry every Compiler and Interpreter in this process uses"""
+    global _shared_registry
+    if _shared_registry is None:
+        _shared_registry = CommandRegistry()
+    return _shared_registry
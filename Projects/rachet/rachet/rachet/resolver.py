@@ -0,0 +1,62 @@
+# Marks a frame slot whose variable has not been assigned yet
+UNSET = object()
+
+class FrameLayout:
+    """Slot assignment for one function: parameters first, then locals."""
+    def __init__(self, names, param_slots):
+        self.names = names
+        self.param_slots = param_slots
+        self.size = len(names)
+        # Parameters normally occupy slots 0..n-1, so args can be copied in
+        # one slice unless a parameter name was repeated
+        self.param_count = len(param_slots)
+        self.contiguous = param_slots == list(range(len(param_slots)))
+
+    def new_frame(self, args):
+        """Build a fixed-size frame list with the arguments bound to their slots"""
+        if self.contiguous:
+            frame = list(args[:self.param_count])
+            frame += [UNSET] * (self.size - len(frame))
+            return frame
+        frame = [UNSET] * self.size
+        for slot, value in zip(self.param_slots, args):
+            frame[slot] = value
+        return frame
+
+def resolve_program(node):
+    """Give every parameter, declaration and variable use a numeric frame slot.
+
+    Rachet variables are function scoped, so every name declared anywhere
+    in a function body shares one slot. Uses of names that are never
+    declared keep slot None and fall back to the global scope at runtime.
+    Returns a FrameLayout per function name.
+    """
+    layouts = {}
+    for child in node.children:
+        if child.type == 'FunctionDeclaration':
+            layouts[child.value] = resolve_function(child)
+    return layouts
+
+def resolve_function(func_node):
+    slots = {}
+    param_slots = []
+    for param in func_node.children[1:]:
+        param.slot = slots.setdefault(param.value, len(slots))
+        param_slots.append(param.slot)
+
+    body = func_node.children[0]
+    collect_declarations(body, slots)
+    assign_slots(body, slots)
+    return FrameLayout(list(slots), param_slots)
+
+def collect_declarations(node, slots):
+    if node.type == 'VariableDeclaration':
+        node.slot = slots.setdefault(node.value, len(slots))
+    for child in node.children:
+        collect_declarations(child, slots)
+
+def assign_slots(node, slots):
+    if node.type == 'Variable':
+        node.slot = slots.get(node.value)
+    for child in node.children:
+        assign_slots(child, slots)
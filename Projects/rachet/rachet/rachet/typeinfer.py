@@ -0,0 +1,110 @@
+from registry import shared_registry
+
+# Static types of 32-bit values in compiled code. UNKNOWN values may be
+# either, and the backends fall back to the runtime STRING_POINTER_MIN split
+NUMBER = 'number'
+STRING = 'string'
+UNKNOWN = 'unknown'
+
+ANNOTATIONS = {'i32': NUMBER, 'string': STRING, 'str': STRING}
+
+ARITHMETIC_OPS = {'PLUS', 'MINUS', 'MULTIPLY', 'DIVIDE'}
+
+def join(a, b):
+    """Combine two facts about one value; None means nothing is known yet"""
+    if a is None:
+        return b
+    if b is None or a == b:
+        return a
+    return UNKNOWN
+
+class TypeInference:
+    """Flow-insensitive type inference over a whole program.
+
+    Every variable gets the join of the types of all its declarations, a
+    `let x: i32`/`string` annotation deciding when the value itself is not
+    known. Parameters get the join of the arguments at every call site and
+    a function's result the join of its return statements, iterated until
+    nothing changes since calls can reach back into functions that are
+    still being typed. Command modules declare the type they produce with
+    a RETURN_TYPE attribute.
+    """
+
+    def __init__(self):
+        self.functions = {}
+        self.variables = {}  # Function name -> {variable name: type}
+        self.returns = {}  # Function name -> type of the value it returns
+        self.changed = False
+
+    def infer(self, ast):
+        self.functions = {child.value: child for child in ast.children if child.type == 'FunctionDeclaration'}
+        self.variables = {name: {} for name in self.functions}
+        self.returns = {}
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            for name, func_node in self.functions.items():
+                self.visit(func_node.children[0], name)
+        return self
+
+    def assign(self, types, name, value_type):
+        joined = join(types.get(name), value_type)
+        if joined != types.get(name):
+            types[name] = joined
+            self.changed = True
+
+    def visit(self, node, function):
+        if node.type == 'VariableDeclaration':
+            value_type = self.expression_type(node.children[0], function)
+            if len(node.children) > 1 and node.children[1].type == 'Type':
+                declared = ANNOTATIONS.get(node.children[1].value, UNKNOWN)
+                if value_type in (None, UNKNOWN):
+                    value_type = declared
+                elif value_type != declared:
+                    value_type = UNKNOWN
+            self.assign(self.variables[function], node.value, value_type)
+        elif node.type == 'ReturnStatement':
+            value_type = self.expression_type(node.children[0], function) if node.children else UNKNOWN
+            self.assign(self.returns, function, value_type)
+        elif node.type == 'FunctionCall' and node.value in self.functions and node.value != 'main':
+            params = self.functions[node.value].children[1:]
+            for param, arg in zip(params, node.children):
+                self.assign(self.variables[node.value], param.value, self.expression_type(arg, function))
+
+        for child in node.children:
+            self.visit(child, function)
+
+    def expression_type(self, node, function):
+        """Type of node's value so far, or None while it depends on unvisited code"""
+        if node.type == 'Number':
+            return NUMBER
+        elif node.type == 'StringLiteral':
+            return STRING
+        elif node.type == 'Variable':
+            return self.variables.get(function, {}).get(node.value)
+        elif node.type == 'UnaryOp':
+            return NUMBER
+        elif node.type == 'BinaryOp':
+            # Comparisons and logic give 0 or 1 whatever they compare
+            if node.value not in ARITHMETIC_OPS:
+                return NUMBER
+            left, right = (self.expression_type(child, function) for child in node.children)
+            if left == right == NUMBER:
+                return NUMBER
+            return None if None in (left, right) else UNKNOWN
+        elif node.type == 'FunctionCall':
+            command_module = shared_registry().get(node.value)
+            if command_module is not None:
+                return getattr(command_module, 'RETURN_TYPE', UNKNOWN)
+            if node.value in self.functions:
+                return self.returns.get(node.value)
+        return UNKNOWN
+
+    def type_of(self, node, function):
+        """Final type of node inside function, NUMBER, STRING or UNKNOWN"""
+        return self.expression_type(node, function) or UNKNOWN
+
+    def count(self):
+        """Return (variables with a known type, all variables)"""
+        types = [value_type for variables in self.variables.values() for value_type in variables.values()]
+        return sum(value_type in (NUMBER, STRING) for value_type in types), len(types)